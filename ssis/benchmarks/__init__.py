@@ -0,0 +1,15 @@
+"""Benchmarks for the SSIS data paths.
+
+Run from the ssis/ directory:
+
+    python -m benchmarks.generate --students 100000 --out /tmp/roster
+    python -m benchmarks.run --sizes 10000 100000
+    python -m benchmarks.compare old.json new.json
+"""
+import os
+import sys
+
+# The application modules live in ssis/src and import each other by name
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
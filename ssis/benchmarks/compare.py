@@ -0,0 +1,70 @@
+"""Compare two result files written by benchmarks.run.
+
+    python -m benchmarks.compare old.json new.json [--threshold 10]
+
+Prints the median of every timing present in both files and the change,
+flagging changes larger than the threshold (in percent).
+"""
+import argparse
+import json
+
+
+def _timings(node, path=()):
+    """Yield (path, median) for every timing in a results tree."""
+    if "median" in node:
+        yield path, node.get("median_per_op", node["median"])
+        return
+    for key, value in node.items():
+        if isinstance(value, dict):
+            yield from _timings(value, path + (key,))
+
+
+def _format(seconds):
+    if seconds >= 1:
+        return f"{seconds:.2f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+def compare(old, new, threshold=10.0):
+    """Rows of (name, old median, new median, percent change, flag)."""
+    old_times = dict(_timings(old["sizes"]))
+    rows = []
+    for path, new_time in _timings(new["sizes"]):
+        old_time = old_times.get(path)
+        if old_time is None:
+            continue
+        change = (new_time - old_time) / old_time * 100 if old_time else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "slower"
+        elif change < -threshold:
+            flag = "faster"
+        rows.append(("/".join(path), old_time, new_time, change, flag))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="percent change to flag (default 10)")
+    args = parser.parse_args()
+
+    with open(args.old, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+
+    rows = compare(old, new, args.threshold)
+    width = max((len(row[0]) for row in rows), default=0)
+    print(f"{old['meta'].get('revision')} -> {new['meta'].get('revision')}")
+    for name, old_time, new_time, change, flag in rows:
+        print(f"{name:<{width}}  {_format(old_time):>10}  {_format(new_time):>10}"
+              f"  {change:+7.1f}%  {flag}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Synthetic colleges/programs/students datasets of any size.
+
+Program sizes follow a Zipf-like curve, year levels thin out towards
+fourth year, and student IDs keep the YYYY-NNNN format by spreading
+enrolment over as many years as the roster needs. A small share of
+students have no program ("N/A"), as left behind by cascading deletes.
+Output is deterministic for a given seed.
+"""
+import argparse
+import csv
+import math
+import os
+import random
+
+from . import SRC_DIR  # noqa: F401  (puts ssis/src on the path)
+import database as db
+
+COLLEGES = [
+    ("CCS", "College of Computer Studies"),
+    ("CEBA", "College of Economics Business and Accountancy"),
+    ("CED", "College of Education"),
+    ("CHS", "College of Health Sciences"),
+    ("COE", "College of Engineering"),
+    ("CSM", "College of Science and Mathematics"),
+    ("CASS", "College of Arts and Social Sciences"),
+    ("CON", "College of Nursing"),
+]
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda",
+    "David", "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Charles", "Karen", "Juan", "Maria", "Jose", "Ana", "Mark",
+    "Angelica", "Paolo", "Kristine", "Carlo", "Nicole", "Miguel", "Rafael",
+    "Camille", "Gabriel", "Bea", "Adrian", "Danica", "Christian", "Jasmine", "Kevin",
+    "Trisha", "Jerome", "Andrea", "Vincent", "Czarina", "Aldrin", "Rhea", "Noel", "Grace",
+]
+
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Santos", "Reyes", "Cruz", "Bautista", "Ocampo",
+    "Mendoza", "Torres", "Villanueva", "Ramos", "Aquino", "Castillo", "Rivera", "Flores",
+    "Gonzales", "Lopez", "Dela Cruz", "Fernandez", "Navarro", "Salazar", "Domingo",
+    "Pascual", "Soriano", "Manalo", "Tolentino", "Aguilar", "Valdez", "Lim", "Tan",
+    "Sy", "Chua", "Villadolid", "Delos Santos", "Macaraeg", "Panganiban", "Dizon",
+]
+
+YEAR_LEVEL_WEIGHTS = {"1": 30, "2": 27, "3": 23, "4": 20}
+GENDER_WEIGHTS = {"M": 48, "F": 48, "O": 4}
+ORPHAN_SHARE = 0.005
+PROGRAMS_PER_COLLEGE = (5, 10)
+LATEST_YEAR = 2025
+
+
+def _programs(rng):
+    programs = []
+    for college_code, college_name in COLLEGES:
+        subject = college_name.split(" of ", 1)[1]
+        for i in range(rng.randint(*PROGRAMS_PER_COLLEGE)):
+            code = f"BS{college_code}{i + 1}"
+            programs.append((code, f"BACHELOR OF SCIENCE IN {subject.upper()} {i + 1}", college_code))
+    return programs
+
+
+def _student_ids(count, rng):
+    """count distinct YYYY-NNNN IDs in enrolment order."""
+    years = max(4, math.ceil(count / 9000))
+    first = LATEST_YEAR - years + 1
+    next_seq = {year: 1 for year in range(first, LATEST_YEAR + 1)}
+    open_years = list(next_seq)
+    for _ in range(count):
+        year = rng.choice(open_years)
+        yield f"{year}-{next_seq[year]:04d}"
+        next_seq[year] += 1
+        if next_seq[year] > 9999:
+            open_years.remove(year)
+
+
+def generate(directory, students, seed=0):
+    """Write colleges.csv, programs.csv and students.csv into directory."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    programs = _programs(rng)
+
+    def write(filename, rows):
+        with open(os.path.join(directory, filename), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(db.SCHEMA[filename]['columns'])
+            writer.writerows(rows)
+
+    write('colleges.csv', COLLEGES)
+    write('programs.csv', programs)
+
+    codes = [code for code, _, _ in programs]
+    rng.shuffle(codes)
+    program_weights = [1 / (rank + 1) ** 0.8 for rank in range(len(codes))]
+    years, year_weights = zip(*YEAR_LEVEL_WEIGHTS.items())
+    genders, gender_weights = zip(*GENDER_WEIGHTS.items())
+
+    def rows():
+        for student_id in _student_ids(students, rng):
+            if rng.random() < ORPHAN_SHARE:
+                program = db.MISSING_PARENT
+            else:
+                program = rng.choices(codes, program_weights)[0]
+            yield (student_id, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                   rng.choices(years, year_weights)[0],
+                   rng.choices(genders, gender_weights)[0], program)
+
+    write('students.csv', rows())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True, help="directory to write the CSV files to")
+    args = parser.parse_args()
+    generate(args.out, args.students, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,457 @@
+"""Time the SSIS data paths on generated rosters and write the results as JSON.
+
+    python -m benchmarks.run                       # 10k and 100k students
+    python -m benchmarks.run --sizes 1000000 --output big.json
+
+Storage benchmarks go through database.py (and so through the SQLite
+backend when SSIS_BACKEND=sqlite). GUI benchmarks drive the data half of
+SSIS_APP -- loading a view, search, sort, paging, patching after an edit --
+against a real Treeview when a display is available and a stand-in
+otherwise. Every benchmark that writes starts from a fresh copy of the
+dataset. Results record the median, min and max of the runs.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+from . import SRC_DIR
+from .generate import generate
+import database as db
+import gui
+import importer
+
+DEFAULT_SIZES = (10000, 100000)
+OPS = 200               # operations per run for the single-record benchmarks
+BENCHMARKS = []
+
+
+def benchmark(func):
+    BENCHMARKS.append(func)
+    return func
+
+
+def _summary(times, ops):
+    result = {
+        "runs": len(times),
+        "median": statistics.median(times),
+        "min": min(times),
+        "max": max(times),
+    }
+    if ops > 1:
+        result["ops"] = ops
+        result["median_per_op"] = result["median"] / ops
+    return result
+
+
+def timed(func, repeat, ops=1):
+    """Run func repeat times; ops is how many operations one run performs."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return _summary(times, ops)
+
+
+def timed_fresh(ds, func, prepare=None, ops=1):
+    """Like timed, but every run gets its own copy of the dataset. prepare
+    runs untimed on the copy and its result is passed to func."""
+    times = []
+    for _ in range(ds.repeat):
+        with ds.copy():
+            arg = prepare() if prepare else None
+            start = time.perf_counter()
+            func(arg)
+            times.append(time.perf_counter() - start)
+    return _summary(times, ops)
+
+
+class Dataset:
+    def __init__(self, source, students, repeat):
+        self.source = source
+        self.students = students
+        self.repeat = repeat
+        self.scratch = tempfile.mkdtemp(prefix='ssis-bench-')
+
+    @contextmanager
+    def copy(self):
+        """Point database.py at a fresh copy of the dataset."""
+        data_dir = tempfile.mkdtemp(dir=self.scratch)
+        shutil.rmtree(data_dir)
+        shutil.copytree(self.source, data_dir)
+        old_dir = db.DATA_DIR
+        db.DATA_DIR = data_dir
+        db.invalidate_cache()
+        try:
+            db.load_table('students.csv')   # opens/seeds the SQLite file, if used
+            yield data_dir
+        finally:
+            db.DATA_DIR = old_dir
+            db.invalidate_cache()
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    def sample(self, filename, count, seed=1):
+        """count primary keys from filename, spread over the file."""
+        rows = db.load_table(filename).rows
+        pk = db.SCHEMA[filename]['pk']
+        step = max(1, len(rows) // count)
+        return [rows[(i * step + seed) % len(rows)][pk] for i in range(count)]
+
+    def close(self):
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+
+# ----------------------------------------------------------------------
+# Storage
+# ----------------------------------------------------------------------
+@benchmark
+def read_data(ds):
+    """cold parses the CSV; cold_snapshot loads the snapshot the first
+    load left behind, and first_page reads just the rows a view shows
+    while it loads."""
+    with ds.copy():
+        def cold():
+            db.invalidate_cache()
+            db.read_data('students.csv')
+
+        def first_page():
+            db.invalidate_cache()
+            db.peek_table('students.csv', gui.Config.PREVIEW_ROWS)
+
+        results = {
+            "cold_snapshot": timed(cold, ds.repeat),
+            "first_page": timed(first_page, ds.repeat),
+        }
+        db.SNAPSHOTS_ENABLED = False
+        try:
+            results["cold"] = timed(cold, ds.repeat)
+        finally:
+            db.SNAPSHOTS_ENABLED = True
+        results["warm"] = timed(lambda: db.read_data('students.csv'), ds.repeat)
+        return results
+
+
+def _new_student(i):
+    return {"student_id": f"1999-{i:04d}", "first_name": "Bench", "last_name": "Mark",
+            "year_level": "1", "gender": "F", "program_code": db.MISSING_PARENT}
+
+
+@benchmark
+def append_row(ds):
+    columns = db.SCHEMA['students.csv']['columns']
+
+    def run(_):
+        for i in range(OPS):
+            db.append_row('students.csv', columns, _new_student(i))
+    return timed_fresh(ds, run, ops=OPS)
+
+
+@benchmark
+def update_row(ds):
+    def prepare():
+        table = db.load_table('students.csv')
+        return [dict(table.lookup('student_id', sid)[0])
+                for sid in ds.sample('students.csv', OPS)]
+
+    def run(rows):
+        for row in rows:
+            db.update_row('students.csv', row['student_id'], dict(row, first_name="Edited"))
+    return timed_fresh(ds, run, prepare, OPS)
+
+
+@benchmark
+def delete_record(ds):
+    def run(ids):
+        for sid in ids:
+            db.delete_record('students.csv', 'student_id', sid)
+    return timed_fresh(ds, run, lambda: ds.sample('students.csv', OPS), OPS)
+
+
+def _largest_program():
+    by_program = db.load_table('students.csv').index('program_code')
+    key = max((k for k in by_program if k != db.normalize_key(db.MISSING_PARENT)),
+              key=lambda k: len(by_program[k]))
+    return next(iter(by_program[key].values()))['program_code']
+
+
+def _busiest_college():
+    programs = db.load_table('programs.csv').rows
+    students = db.load_table('students.csv').index('program_code')
+    load = {}
+    for p in programs:
+        load[p['college_code']] = load.get(p['college_code'], 0) + len(
+            students.get(db.normalize_key(p['program_code']), ()))
+    return max(load, key=load.get)
+
+
+def _record(filename, pk_value):
+    pk = db.SCHEMA[filename]['pk']
+    return dict(db.load_table(filename).lookup(pk, pk_value)[0])
+
+
+@benchmark
+def cascades(ds):
+    """The largest program and the college with the most students, so the
+    cascades touch as many rows as the dataset allows."""
+    def update_program(code):
+        db.update_program_cascade(code, dict(_record('programs.csv', code), program_code=code + "X"))
+
+    def update_college(code):
+        db.update_college_cascade(code, dict(_record('colleges.csv', code), college_code=code + "X"))
+
+    return {
+        "update_program": timed_fresh(ds, update_program, _largest_program),
+        "delete_program": timed_fresh(ds, db.delete_program_cascade, _largest_program),
+        "update_college": timed_fresh(ds, update_college, _busiest_college),
+        "delete_college": timed_fresh(ds, db.delete_college_cascade, _busiest_college),
+    }
+
+
+@benchmark
+def validation(ds):
+    with ds.copy():
+        program = _largest_program()
+        existing = ds.sample('students.csv', OPS)
+
+        def run():
+            for i, sid in enumerate(existing):
+                db.validate_student(sid, "F", program)
+                db.validate_student(f"1999-{i:04d}", "F", program)
+        return timed(run, ds.repeat, 2 * OPS)
+
+
+@benchmark
+def import_csv(ds):
+    # Another roster of half the size: its IDs overlap the dataset's, so an
+    # upsert both updates and inserts
+    source = os.path.join(ds.scratch, 'import')
+    generate(source, ds.students // 2, seed=99)
+    path = os.path.join(source, 'students.csv')
+
+    def run(mode, dry_run):
+        return lambda _: importer.import_file('students.csv', path, mode=mode, dry_run=dry_run)
+    return {
+        "dry_run": timed_fresh(ds, run("upsert", True)),
+        "upsert": timed_fresh(ds, run("upsert", False)),
+        "replace": timed_fresh(ds, run("replace", False)),
+    }
+
+
+# ----------------------------------------------------------------------
+# GUI data paths
+# ----------------------------------------------------------------------
+class _NullTree:
+    """Stands in for ttk.Treeview when there is no display."""
+
+    def __init__(self):
+        self._count = 0
+
+    def insert(self, parent, index, **kwargs):
+        self._count += 1
+        return f"I{self._count}"
+
+    def item(self, item, **kwargs):
+        pass
+
+    def detach(self, item):
+        pass
+
+    def move(self, item, parent, index):
+        pass
+
+
+class _Entry:
+    def __init__(self):
+        self.text = ""
+
+    def get(self):
+        return self.text
+
+
+class HeadlessApp:
+    """The data half of SSIS_APP, driven without its widgets. Methods are
+    borrowed from SSIS_APP so the timings cover the shipped code; only
+    load_table_data is replaced, by drawing the current page."""
+
+    _fetch_view_data = gui.SSIS_APP._fetch_view_data
+    _fetch_view_preview = gui.SSIS_APP._fetch_view_preview
+    _view_data = gui.SSIS_APP._view_data
+    _derived_columns = gui.SSIS_APP._derived_columns
+    _college_lookup = gui.SSIS_APP._college_lookup
+    _set_view_data = gui.SSIS_APP._set_view_data
+    _apply_sort = gui.SSIS_APP._apply_sort
+    _search_query = gui.SSIS_APP._search_query
+    _column_lengths = gui.SSIS_APP._column_lengths
+    _patch_record = gui.SSIS_APP._patch_record
+    filter_search = gui.SSIS_APP.filter_search
+
+    def __init__(self, tree):
+        self.current_view = "students"
+        self._load_generation = 0
+        self._shown_generation = None
+        self._college_join = None
+        self._filtered_lengths = {}
+        self._lengths_version = None
+        self.sort_spec = []
+        self.placeholder_text = "Search..."
+        self.search_entry = _Entry()
+        self.table = gui.VirtualTable(tree, trailing=("Edit", "Delete"))
+        self.rows_per_page = 15
+        self.current_page = 1
+        self.scroll_offset = 0
+
+    def load(self, view="students"):
+        self.current_view = view
+        self._set_view_data(view, self._load_generation, *self._fetch_view_data(view))
+
+    def load_table_data(self, view_type, refresh_cache=True):
+        start = (self.current_page - 1) * self.rows_per_page
+        self._column_lengths()
+        self.table.show(self.all_data_cache[start:start + self.rows_per_page])
+
+
+def _tree():
+    """A real Treeview if Tk can open a display, else a stand-in."""
+    try:
+        root = gui.tk.Tk()
+    except gui.tk.TclError:
+        return _NullTree(), False
+    root.withdraw()
+    return gui.ttk.Treeview(root, show="headings"), True
+
+
+TYPED_QUERY = "mari"
+FIELDED_QUERIES = ["year:3-4", "gender:f year:1", "name:gar*", "program:bscoe1,bsccs2"]
+
+
+@benchmark
+def gui_paths(ds):
+    tree, real_tree = _tree()
+    results = {"treeview": "tk" if real_tree else "stand-in"}
+    with ds.copy():
+        app = HeadlessApp(tree)
+        results["view_load"] = timed(app.load, ds.repeat)
+
+        def type_query():
+            for i in range(1, len(TYPED_QUERY) + 1):
+                app.search_entry.text = TYPED_QUERY[:i]
+                app.filter_search()
+            app.search_entry.text = ""
+            app.filter_search()
+        results["filter_search_typing"] = timed(type_query, ds.repeat, len(TYPED_QUERY) + 1)
+
+        def fielded():
+            for query in FIELDED_QUERIES:
+                app.search_entry.text = query
+                app.filter_search()
+            app.search_entry.text = ""
+            app.filter_search()
+        results["filter_search_fielded"] = timed(fielded, ds.repeat, len(FIELDED_QUERIES) + 1)
+
+        columns = db.SCHEMA['students.csv']['columns'] + ["college_code"]
+
+        def sort_each(reverse):
+            def run():
+                for column in columns:
+                    app.sort_spec = [(column, reverse)]
+                    app._apply_sort()
+            return run
+        app.load()
+        results["apply_sort_first"] = timed(sort_each(False), 1, len(columns))
+        results["apply_sort_cached"] = timed(sort_each(False), ds.repeat, len(columns))
+        app.sort_spec = [("last_name", False), ("first_name", False), ("year_level", True)]
+        results["apply_sort_multi"] = timed(app._apply_sort, ds.repeat)
+
+        pages = 50
+
+        def flip():
+            for page in range(1, pages + 1):
+                app.current_page = page
+                app.load_table_data(app.current_view, refresh_cache=False)
+        results["page_render"] = timed(flip, ds.repeat, pages)
+
+        ids = ds.sample('students.csv', OPS)
+
+        def patch():
+            for sid in ids:
+                record = dict(app.record_index[db.normalize_key(sid)].items(), first_name="Patched")
+                app._patch_record(sid, record)
+        results["patch_record"] = timed(patch, ds.repeat, OPS)
+    return results
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat=3, seed=0, only=None, datasets_dir=None, log=print):
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "backend": db.BACKEND,
+            "fsync_writes": db.FSYNC_WRITES,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "sizes": {},
+    }
+    datasets_dir = datasets_dir or tempfile.mkdtemp(prefix='ssis-data-')
+    for students in sizes:
+        source = os.path.join(datasets_dir, f"{students}-{seed}")
+        if not os.path.exists(os.path.join(source, 'students.csv')):
+            log(f"generating {students} students...")
+            generate(source, students, seed)
+        ds = Dataset(source, students, repeat)
+        size_results = results["sizes"][str(students)] = {}
+        try:
+            for bench in BENCHMARKS:
+                if only and bench.__name__ not in only:
+                    continue
+                log(f"[{students}] {bench.__name__}")
+                size_results[bench.__name__] = bench(ds)
+        finally:
+            ds.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', metavar='NAME',
+                        choices=[b.__name__ for b in BENCHMARKS],
+                        help="run only these benchmarks")
+    parser.add_argument('--datasets', help="directory to keep generated datasets in between runs")
+    parser.add_argument('--output', help="JSON file to write (default: results-<timestamp>.json)")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.seed, args.only, args.datasets)
+    output = args.output or f"results-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {output}")
+
+
+if __name__ == '__main__':
+    main()
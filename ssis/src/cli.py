@@ -0,0 +1,322 @@
+"""Headless command line for batch jobs on the SSIS tables.
+
+    python main.py import students new.csv --mode upsert
+    python main.py export programs > programs.csv
+    python main.py query students "year:3-4 program:bscs" --sort last_name,-year_level
+    python main.py add colleges college_code=CCS "college_name=College of Computer Studies"
+    python main.py update programs BSCS program_code=BSCS2
+    python main.py delete students 2021-0001 2021-0002
+    python main.py stats --check
+
+Tables are named as in the GUI (students, programs, colleges). Rows are
+read from and written to stdin/stdout as CSV when the file is "-";
+messages go to stderr. Writes go through database.py with the same
+validation and cascades as the GUI, and never import Tk; their journals
+are folded into the CSV files before exiting. Exits with 1
+when a record is rejected or a check fails, 2 on a usage error.
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+
+import database as db
+import importer
+import instrument
+from search import SearchIndex
+from sorting import SortCache
+
+TABLES = {filename[:-len('.csv')]: filename for filename in db.SCHEMA}
+
+
+class CommandError(Exception):
+    """A problem with the user's input, reported without a traceback."""
+
+
+def _filename(table):
+    filename = TABLES.get(table[:-len('.csv')] if table.endswith('.csv') else table)
+    if filename is None:
+        raise CommandError(f"Unknown table '{table}'; use one of {', '.join(TABLES)}.")
+    return filename
+
+
+def _stdin():
+    return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+
+
+def _assignments(pairs, filename):
+    """column -> value from "column=value" arguments."""
+    columns = db.SCHEMA[filename]['columns']
+    values = {}
+    for pair in pairs:
+        column, sep, value = pair.partition('=')
+        if not sep:
+            raise CommandError(f"Expected column=value, got '{pair}'.")
+        if column not in columns:
+            raise CommandError(f"Unknown column '{column}'; {filename} has {', '.join(columns)}.")
+        values[column] = value
+    return values
+
+
+def _derived(filename):
+    """Computed columns, as the GUI shows them."""
+    if filename != 'students.csv':
+        return {}
+    lookup = {p["program_code"]: p["college_code"] for p in db.load_table("programs.csv").rows}
+    return {"college_code": lambda row: lookup.get(row.get("program_code", ""), db.MISSING_PARENT)}
+
+
+def _sort_spec(text, columns):
+    """[(column, reverse)] from "col,-col"."""
+    spec = []
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        reverse = part.startswith('-')
+        column = part.lstrip('-')
+        if column not in columns:
+            raise CommandError(f"Cannot sort by unknown column '{column}'.")
+        spec.append((column, reverse))
+    return spec
+
+
+def _write_rows(out, columns, rows, fmt):
+    if fmt == 'jsonl':
+        for row in rows:
+            out.write(json.dumps({col: row[col] for col in columns}) + "\n")
+        return
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    writer.writerows([row[col] for col in columns] for row in rows)
+
+
+def _emit(path, columns, rows, fmt):
+    """Write rows to path, or to stdout when path is "-"."""
+    if path != '-':
+        with open(path, mode='w', newline='', encoding='utf-8') as out:
+            _write_rows(out, columns, rows, fmt)
+        return
+    out = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='')
+    try:
+        _write_rows(out, columns, rows, fmt)
+        out.flush()
+    finally:
+        out.detach()    # leave sys.stdout usable
+
+
+# ----------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------
+def cmd_import(args):
+    filename = _filename(args.table)
+    source = _stdin() if args.file == '-' else args.file
+    result = importer.import_file(filename, source, args.mode, dry_run=args.dry_run)
+    for line, message in result.errors:
+        print(f"Line {line}: {message}", file=sys.stderr)
+    verb = "Would import" if args.dry_run else "Imported"
+    print(f"{verb}: {result.inserted} added, {result.updated} updated, "
+          f"{result.skipped} skipped, {len(result.errors)} rejected.", file=sys.stderr)
+    return 1 if result.errors else 0
+
+
+def cmd_export(args):
+    filename = _filename(args.table)
+    table = db.load_table(filename)
+    _emit(args.file, table.headers or db.SCHEMA[filename]['columns'], table.rows, args.format)
+    return 0
+
+
+def cmd_query(args):
+    filename = _filename(args.table)
+    table = db.load_table(filename)
+    derived = _derived(filename)
+    columns = (table.headers or db.SCHEMA[filename]['columns']) + list(derived)
+    rows = table.rows
+    if args.query:
+        # Same query language as the GUI's search box
+        rows = SearchIndex(rows, derived).query(args.query)
+    if args.sort:
+        spec = _sort_spec(args.sort, columns)
+        rows = SortCache(table.rows, derived=derived).sorted_rows(rows, spec)
+    if args.limit is not None:
+        rows = rows[:args.limit]
+    if derived:
+        rows = [dict(row, **{col: func(row) for col, func in derived.items()}) for row in rows]
+    _emit('-', columns, rows, args.format)
+    return 0
+
+
+def cmd_add(args):
+    filename = _filename(args.table)
+    error, record = db.save_record(filename, _assignments(args.values, filename))
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    print(f"Added {record[db.SCHEMA[filename]['pk']]}.", file=sys.stderr)
+    return 0
+
+
+def cmd_update(args):
+    filename = _filename(args.table)
+    pk_col = db.SCHEMA[filename]['pk']
+    matches = db.load_table(filename).lookup(pk_col, args.key)
+    if not matches:
+        print(f"No {args.table} record '{args.key}'.", file=sys.stderr)
+        return 1
+    old_pk = matches[0][pk_col]
+    record = dict(matches[0], **_assignments(args.values, filename))
+    error, saved = db.save_record(filename, record, old_pk)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    print(f"Updated {saved[pk_col] if saved else old_pk}.", file=sys.stderr)
+    return 0
+
+
+def cmd_delete(args):
+    filename = _filename(args.table)
+    pk_col = db.SCHEMA[filename]['pk']
+    keys = args.keys
+    if keys == ['-']:
+        keys = [line.strip() for line in _stdin() if line.strip()]
+
+    cascade = bool(db.child_tables(filename))
+    missing = 0
+    for key in keys:
+        if cascade:
+            changes = db.delete_cascade(filename, key)
+            found = changes[filename]
+        else:
+            found = len(db.delete_record(filename, pk_col, key))
+        if not found:
+            print(f"No {args.table} record '{key}'.", file=sys.stderr)
+            missing += 1
+        elif cascade:
+            detached = sum(n for name, n in changes.items() if name != filename)
+            print(f"Deleted {key}; {detached} referencing rows set to {db.MISSING_PARENT}.",
+                  file=sys.stderr)
+    print(f"Deleted {len(keys) - missing} of {len(keys)}.", file=sys.stderr)
+    return 1 if missing else 0
+
+
+def table_stats(filename):
+    """Row count and integrity problems of one table."""
+    spec = db.SCHEMA[filename]
+    table = db.load_table(filename)
+    pk_index = table.index(spec['pk'])
+    stats = {
+        "rows": len(table.rows),
+        "journal_entries": table.journal_entries,
+        "duplicate_keys": sum(len(rows) - 1 for rows in pk_index.values() if len(rows) > 1),
+        "empty_keys": len(pk_index.get('', ())),
+    }
+    if spec['parent']:
+        fk_col, parent_file = spec['parent']
+        parent_keys = db.load_table(parent_file).index(db.SCHEMA[parent_file]['pk'])
+        orphaned = dangling = 0
+        for key, rows in table.index(fk_col).items():
+            if key == db.normalize_key(db.MISSING_PARENT):
+                orphaned += len(rows)
+            elif key not in parent_keys:
+                dangling += len(rows)
+        stats["orphaned"] = orphaned      # parent deleted; allowed
+        stats["dangling_keys"] = dangling
+    if filename == 'students.csv':
+        stats["invalid_ids"] = sum(not db.is_valid_student_id(r['student_id']) for r in table.rows)
+        stats["invalid_genders"] = sum(r['gender'] not in db.GENDER_OPTIONS for r in table.rows)
+    return stats
+
+
+# Counts that mean the data breaks a rule the GUI enforces
+PROBLEMS = ("duplicate_keys", "empty_keys", "dangling_keys", "invalid_ids", "invalid_genders")
+
+
+def cmd_stats(args):
+    filenames = [_filename(args.table)] if args.table else list(db.SCHEMA)
+    report = {filename[:-len('.csv')]: table_stats(filename) for filename in filenames}
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, stats in report.items():
+            print(f"{name}: " + ", ".join(f"{k.replace('_', ' ')} {v}" for k, v in stats.items()))
+    problems = sum(stats.get(key, 0) for stats in report.values() for key in PROBLEMS)
+    if args.check and problems:
+        print(f"{problems} problems found.", file=sys.stderr)
+        return 1
+    return 0
+
+
+# ----------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py", description="Batch operations on the SSIS tables, without the GUI."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    tables = ", ".join(TABLES)
+
+    p = commands.add_parser("import", help="import a CSV file")
+    p.add_argument("table", help=tables)
+    p.add_argument("file", nargs="?", default="-", help="CSV file, or - for stdin (default)")
+    p.add_argument("--mode", choices=list(importer.MODES), default="upsert")
+    p.add_argument("--dry-run", action="store_true", help="only validate and report")
+    p.set_defaults(func=cmd_import)
+
+    p = commands.add_parser("export", help="write a table as CSV")
+    p.add_argument("table", help=tables)
+    p.add_argument("file", nargs="?", default="-", help="output file, or - for stdout (default)")
+    p.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser("query", help="search a table, as the GUI search box does")
+    p.add_argument("table", help=tables)
+    p.add_argument("query", nargs="?", default="", help='e.g. "year:3-4 gender:f garcia"')
+    p.add_argument("--sort", help="comma separated columns, - prefix for descending "
+                   "(write --sort=-col when the first one is descending)")
+    p.add_argument("--limit", type=int)
+    p.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    p.set_defaults(func=cmd_query)
+
+    p = commands.add_parser("add", help="add one record")
+    p.add_argument("table", help=tables)
+    p.add_argument("values", nargs="+", metavar="column=value")
+    p.set_defaults(func=cmd_add)
+
+    p = commands.add_parser("update", help="change one record; key changes cascade")
+    p.add_argument("table", help=tables)
+    p.add_argument("key", help="primary key of the record")
+    p.add_argument("values", nargs="+", metavar="column=value")
+    p.set_defaults(func=cmd_update)
+
+    p = commands.add_parser("delete", help="delete records; children are detached")
+    p.add_argument("table", help=tables)
+    p.add_argument("keys", nargs="+", metavar="key", help="primary keys, or - to read them from stdin")
+    p.set_defaults(func=cmd_delete)
+
+    p = commands.add_parser("stats", help="row counts and integrity checks")
+    p.add_argument("table", nargs="?", help=tables)
+    p.add_argument("--json", action="store_true")
+    p.add_argument("--check", action="store_true", help="exit with 1 if any problem is found")
+    p.set_defaults(func=cmd_stats)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        status = args.func(args)
+        db.compact_journals()
+        return status
+    except CommandError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # The reader went away (e.g. piped into head); not an error for us
+        sys.stderr.close()
+        return 0
+    finally:
+        instrument.log_snapshot()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""Column-oriented storage for the loaded tables and the views of them."""
+from array import array
+from collections import Counter
+from itertools import repeat
+
+import sorting
+
+# A column is stored as codes into a list of distinct values when it has
+# at most this many of them, or one per CATEGORY_RATIO rows if that is more.
+CATEGORY_LIMIT = 256
+CATEGORY_RATIO = 8
+
+
+def _is_int(value):
+    # Plain, canonical integers that fit the array's 64-bit slots
+    return value.isdigit() and len(value) < 19 and str(int(value)) == value
+
+
+class RowView:
+    """One record of a ColumnarTable, read like the dict read_data returns.
+
+    Views are created once per row and are what the GUI caches hold, so
+    they can be compared and hashed by identity like the dicts they
+    replace."""
+
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, column):
+        return self._table.get(self._index, column)
+
+    def get(self, column, default=None):
+        if column not in self._table.slots:
+            return default
+        return self._table.get(self._index, column)
+
+    def __contains__(self, column):
+        return column in self._table.slots
+
+    def __iter__(self):
+        return iter(self._table.columns)
+
+    def __len__(self):
+        return len(self._table.columns)
+
+    def keys(self):
+        return self._table.slots.keys()
+
+    def values(self):
+        table, index = self._table, self._index
+        return [table.get(index, column) for column in table.columns]
+
+    def items(self):
+        return list(zip(self._table.columns, self.values()))
+
+    def update(self, changes):
+        for column, value in dict(changes).items():
+            if column in self._table.slots:
+                self._table.set(self._index, column, value)
+
+    def __repr__(self):
+        return f"RowView({dict(self.items())!r})"
+
+
+class ColumnarTable:
+    """Records stored column by column instead of one dict per row.
+
+    Columns typed 'integer' in SCHEMA are kept in an array while every
+    value is a plain integer. Columns with few distinct values (gender,
+    program, year, ...) are stored as integer codes into one shared list of
+    strings. Anything else is a list of strings. rows holds one RowView per
+    record, in load order. A removed record's view is dropped from rows and
+    its slot freed by the next load or copy()."""
+
+    def __init__(self, columns, records=(), types=None):
+        records = list(records)
+        self._build(columns, [[str(record.get(column, "")) for record in records]
+                              for column in columns], types)
+
+    @classmethod
+    def from_columns(cls, columns, data, types=None):
+        """Table over one list of string values per column, e.g. as parsed
+        from a file, without building a record for each row first."""
+        table = cls.__new__(cls)
+        table._build(columns, data, types)
+        return table
+
+    def _build(self, columns, data, types):
+        types = sorting.column_types() if types is None else types
+        self.columns = list(columns)
+        self.slots = {column: i for i, column in enumerate(self.columns)}
+        self._kind = []         # per column: "int", "category" or "text"
+        self._data = []         # per column: array or list, one entry per row
+        self._values = []       # per category column: code -> value
+        self._codes = []        # per category column: value -> code
+
+        count = len(data[0]) if data else 0
+        limit = max(CATEGORY_LIMIT, count // CATEGORY_RATIO)
+        for column, values in zip(self.columns, data):
+            distinct = set(values)
+            values_list, codes = None, None
+            if types.get(column) == "integer" and all(map(_is_int, distinct)):
+                kind, column_data = "int", array('q', map(int, values))
+            elif len(distinct) <= limit:
+                values_list = sorted(distinct)
+                codes = {value: code for code, value in enumerate(values_list)}
+                kind, column_data = "category", array('I', map(codes.__getitem__, values))
+            else:
+                kind, column_data = "text", list(values)
+            self._kind.append(kind)
+            self._data.append(column_data)
+            self._values.append(values_list)
+            self._codes.append(codes)
+
+        self.rows = [RowView(self, i) for i in range(count)]
+
+    def copy(self):
+        """A table with the same records, in the same order, that can be
+        changed without affecting this one. Slots of records dropped from
+        rows are not carried over."""
+        positions = [view._index for view in self.rows]
+        table = ColumnarTable.__new__(ColumnarTable)
+        table.columns = list(self.columns)
+        table.slots = dict(self.slots)
+        table._kind = list(self._kind)
+        table._data = []
+        for data in self._data:
+            picked = map(data.__getitem__, positions)
+            table._data.append(array(data.typecode, picked) if isinstance(data, array)
+                               else list(picked))
+        table._values = [None if values is None else list(values) for values in self._values]
+        table._codes = [None if codes is None else dict(codes) for codes in self._codes]
+        table.rows = [RowView(table, i) for i in range(len(positions))]
+        return table
+
+    def __len__(self):
+        return len(self._data[0]) if self._data else 0
+
+    def get(self, index, column):
+        slot = self.slots[column]
+        value = self._data[slot][index]
+        kind = self._kind[slot]
+        if kind == "category":
+            return self._values[slot][value]
+        if kind == "int":
+            return str(value)
+        return value
+
+    def column_values(self, column, rows=None):
+        """column's values for rows (default: all of them), decoded in one
+        pass rather than a lookup per row."""
+        slot = self.slots[column]
+        rows = self.rows if rows is None else rows
+        values = map(self._data[slot].__getitem__, [view._index for view in rows])
+        kind = self._kind[slot]
+        if kind == "category":
+            return list(map(self._values[slot].__getitem__, values))
+        if kind == "int":
+            return list(map(str, values))
+        return list(values)
+
+    def longest(self, rows=None):
+        """column -> length of its longest value among rows (default: all
+        of them). Category columns only look at the distinct codes present
+        and integer columns at their extremes, so no value is decoded per row."""
+        positions = [view._index for view in (self.rows if rows is None else rows)]
+        if not positions:
+            return {}
+        longest = {}
+        for column, slot in self.slots.items():
+            picked = map(self._data[slot].__getitem__, positions)
+            kind = self._kind[slot]
+            if kind == "category":
+                values = self._values[slot]
+                longest[column] = max(len(values[code]) for code in set(picked))
+            elif kind == "int":
+                picked = list(picked)
+                longest[column] = max(len(str(min(picked))), len(str(max(picked))))
+            else:
+                longest[column] = max(map(len, picked))
+        return longest
+
+    def records(self, rows=None):
+        """rows (default: all of them) as plain dicts."""
+        columns = [self.column_values(column, rows) for column in self.columns]
+        return list(map(dict, map(zip, repeat(self.columns), zip(*columns))))
+
+    def _encode(self, slot, value):
+        """value as stored in column slot, changing the column's storage
+        if it cannot hold it."""
+        kind = self._kind[slot]
+        if kind == "int":
+            if _is_int(value):
+                return int(value)
+            self._data[slot] = [str(v) for v in self._data[slot]]
+            self._kind[slot] = "text"
+        elif kind == "category":
+            codes = self._codes[slot]
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self._values[slot])
+                self._values[slot].append(value)
+            return code
+        return value
+
+    def set(self, index, column, value):
+        slot = self.slots[column]
+        self._data[slot][index] = self._encode(slot, str(value))
+
+    def append(self, record):
+        """Add a record (any mapping) and return its view."""
+        for slot, column in enumerate(self.columns):
+            value = self._encode(slot, str(record.get(column, "")))
+            self._data[slot].append(value)
+        view = RowView(self, len(self) - 1)
+        self.rows.append(view)
+        return view
+
+    def remove(self, view):
+        """Drop a record's view from rows. Views are only ever appended and
+        removed, so rows stays in slot order and the view is found by
+        binary search rather than a scan."""
+        rows = self.rows
+        lo, hi = 0, len(rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if rows[mid]._index < view._index:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(rows) and rows[lo] is view:
+            del rows[lo]
+
+
+class ColumnLengths:
+    """Longest value (as displayed text) per column over a set of records.
+
+    Each column keeps a count of records per value length, so records can
+    be added and removed without rescanning the rest. derived maps computed
+    column names to functions of a record."""
+
+    def __init__(self, records=(), derived=None):
+        self.derived = derived or {}
+        self._counts = {}       # column -> {length: records}
+        for record in records:
+            self.add(record)
+
+    @classmethod
+    def of_table(cls, table, derived=None):
+        """Lengths over every record of a ColumnarTable, counted a column
+        at a time."""
+        lengths = cls(derived=derived)
+        for column in table.columns:
+            lengths._counts[column] = Counter(map(len, table.column_values(column)))
+        for column, func in lengths.derived.items():
+            lengths._counts[column] = Counter(map(len, map(str, map(func, table.rows))))
+        return lengths
+
+    def _lengths(self, record):
+        for column in record:
+            yield column, len(str(record[column]))
+        for column, func in self.derived.items():
+            yield column, len(str(func(record)))
+
+    def add(self, record):
+        for column, length in self._lengths(record):
+            counts = self._counts.setdefault(column, {})
+            counts[length] = counts.get(length, 0) + 1
+
+    def remove(self, record):
+        """Forget record; call before changing it in place."""
+        for column, length in self._lengths(record):
+            counts = self._counts.get(column)
+            if counts and length in counts:
+                counts[length] -= 1
+                if not counts[length]:
+                    del counts[length]
+
+    def longest(self):
+        """column -> length of its longest value."""
+        return {column: max(counts) for column, counts in self._counts.items() if counts}
+
+
+def longest_values(table, rows, derived=None):
+    """Same as ColumnLengths(rows, derived).longest() for rows of a
+    ColumnarTable, scanning the stored columns instead of every record."""
+    longest = table.longest(rows)
+    if rows:
+        for column, func in (derived or {}).items():
+            longest[column] = max(map(len, map(str, map(func, rows))))
+    return longest
@@ -1,78 +1,755 @@
 import csv
+import hashlib
+import json
+import marshal
 import os
 import re
+import tempfile
+import time
+from contextlib import contextmanager
+
+import columnar
+import instrument
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, '..', 'data')
 GENDER_OPTIONS = ["M", "F", "O"]
 
+# Flush writes through to the disk before returning. Slower, but a record
+# acknowledged by the GUI survives a power cut.
+FSYNC_WRITES = True
+
+# Updates and deletes are logged to "<file>.journal" instead of rewriting
+# the CSV; the log is folded back into the CSV once it holds
+# JOURNAL_MAX_ENTRIES records or is older than JOURNAL_MAX_AGE seconds,
+# and when the app or the command line exits. The log names the size and a
+# hash of the CSV it applies to, so copying or touching the CSV keeps it.
+JOURNAL_ENABLED = True
+JOURNAL_MAX_ENTRIES = 500
+JOURNAL_MAX_AGE = 600
+
+# Parsed tables are also saved to ".<file>.snapshot" in a binary form
+# that loads several times faster than the CSV and whose first rows can
+# be read on their own, so the GUI can show a page before the whole table
+# is loaded. Snapshots are only used while the CSV and its journal are
+# exactly as they were when it was taken.
+SNAPSHOTS_ENABLED = True
+SNAPSHOT_MIN_ROWS = 1000
+SNAPSHOT_HEAD_ROWS = 500
+
+# Storage backend: "csv" keeps data/*.csv as the source of truth, "sqlite"
+# keeps the same tables in data/ssis.db (see sqlite_backend.py).
+BACKEND = os.environ.get('SSIS_BACKEND', 'csv').lower()
+
+# Tables in parent -> child order. "parent" is the (column, parent file)
+# foreign key, if the table has one. "types" names how columns sort (see
+# sorting.SORT_TYPES); unlisted columns sort as text.
+SCHEMA = {
+    'colleges.csv': {
+        'columns': ['college_code', 'college_name'],
+        'pk': 'college_code',
+        'parent': None
+    },
+    'programs.csv': {
+        'columns': ['program_code', 'program_name', 'college_code'],
+        'pk': 'program_code',
+        'parent': ('college_code', 'colleges.csv')
+    },
+    'students.csv': {
+        'columns': ['student_id', 'first_name', 'last_name', 'year_level', 'gender', 'program_code'],
+        'pk': 'student_id',
+        'parent': ('program_code', 'programs.csv'),
+        'types': {'student_id': 'student_id', 'year_level': 'integer'}
+    }
+}
+
 def get_file_path(filename):
     os.makedirs(DATA_DIR, exist_ok=True)
     return os.path.join(DATA_DIR, filename)
 
+def normalize_key(value):
+    return str(value).strip().lower()
+
+# ----------------------------------------------------------------------
+# In-memory table store
+# ----------------------------------------------------------------------
+class Table:
+    """Parsed contents of one CSV file, tagged with the file's mtime/size.
+
+    The values are held column by column in a ColumnarTable; rows are its
+    RowViews, which read like dicts. Hash indexes (normalized value ->
+    {id(row): row}) are built on first use per column and kept current by
+    insert/update/remove, so key lookups and single-row writes stay O(1)
+    no matter how large the file grows."""
+
+    def __init__(self, headers, rows, signature, store=None):
+        self.headers = headers
+        self.store = store if store is not None else columnar.ColumnarTable(headers, rows)
+        self.rows = self.store.rows
+        self.signature = signature
+        self.journal_entries = 0
+        self.journal_created = None
+        self._indexes = {}
+
+    @classmethod
+    def from_columns(cls, headers, columns, signature):
+        """Table over one list of values per header."""
+        return cls(headers, (), signature, columnar.ColumnarTable.from_columns(headers, columns))
+
+    def index(self, column):
+        idx = self._indexes.get(column)
+        if idx is None:
+            idx = {}
+            for row in self.rows:
+                _index_row(idx, normalize_key(row.get(column, "")), row)
+            self._indexes[column] = idx
+        return idx
+
+    def lookup(self, column, value):
+        return list(self.index(column).get(normalize_key(value), {}).values())
+
+    def insert(self, row):
+        """Add a record (any mapping); returns its row."""
+        row = self.store.append(row)
+        for column, idx in self._indexes.items():
+            _index_row(idx, normalize_key(row.get(column, "")), row)
+        return row
+
+    def update(self, row, changes):
+        for column, idx in self._indexes.items():
+            if column in changes:
+                _unindex(idx, normalize_key(row.get(column, "")), row)
+        row.update(changes)
+        for column, idx in self._indexes.items():
+            if column in changes:
+                _index_row(idx, normalize_key(row.get(column, "")), row)
+
+    def remove(self, rows):
+        for row in rows:
+            self.store.remove(row)
+            for column, idx in self._indexes.items():
+                _unindex(idx, normalize_key(row.get(column, "")), row)
+
+
+def _index_row(idx, key, row):
+    bucket = idx.get(key)
+    if bucket is None:
+        bucket = idx[key] = {}
+    bucket[id(row)] = row
+
+
+def _unindex(idx, key, row):
+    bucket = idx.get(key)
+    if bucket is None:
+        return
+    bucket.pop(id(row), None)
+    if not bucket:
+        del idx[key]
+
+
+_tables = {}
+
+
+def _file_signature(file_path):
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _parse_file(file_path):
+    """(headers, one list of values per header). Blank lines are skipped,
+    short rows padded with '' and extra fields dropped, as DictReader
+    would."""
+    with open(file_path, mode='r', encoding='utf-8', newline='') as file:
+        reader = csv.reader(file, skipinitialspace=True)
+        headers = next(reader, [])
+        width = len(headers)
+        records = [row if len(row) == width else (row + [''] * width)[:width]
+                   for row in reader if row]
+        instrument.count(rows=len(records), read=os.fstat(file.fileno()).st_size)
+    if not records:
+        return headers, [[] for _ in headers]
+    return headers, [list(values) for values in zip(*records)]
+
+
+def _journal_path(filename):
+    return get_file_path(filename + '.journal')
+
+
+def _table_signature(filename):
+    return (_file_signature(get_file_path(filename)),
+            _file_signature(_journal_path(filename)))
+
+
+def load_table(filename):
+    """Return the cached Table for filename, re-parsing only when the file
+    or its journal changed on disk (different mtime or size) since it was
+    last loaded."""
+    if not _recovered:
+        _recover_commit()
+    signature = _table_signature(filename)
+    table = _tables.get(filename)
+    if table is not None and table.signature == signature:
+        return table
+
+    if signature[0] is None:
+        table = Table([], [], signature)
+    else:
+        table = _read_snapshot(filename, signature)
+        if table is None:
+            headers, columns = _parse_file(get_file_path(filename))
+            table = Table.from_columns(headers, columns, signature)
+            if signature[1] is not None:
+                _replay_journal(filename, table)
+            _write_snapshot(filename, table)
+    _tables[filename] = table
+    return table
+
+
+def peek_table(filename, count):
+    """(headers, first count rows, total rows) without loading the whole
+    table, or None if that would mean parsing it."""
+    if not _recovered:
+        _recover_commit()
+    signature = _table_signature(filename)
+    table = _tables.get(filename)
+    if table is not None and table.signature == signature:
+        return table.headers, table.store.records(table.rows[:count]), len(table.rows)
+    header = _snapshot_header(filename, signature)
+    if header is None:
+        return None
+    f, head = header
+    f.close()
+    rows = [dict(zip(head["headers"], values)) for values in head["head"][:count]]
+    return list(head["headers"]), rows, head["count"]
+
+
+def _touch_table(filename, table):
+    """Record the on-disk signature after we wrote the file ourselves."""
+    table.signature = _table_signature(filename)
+
+
+# ----------------------------------------------------------------------
+# Snapshots
+# ----------------------------------------------------------------------
+# A snapshot is two marshal records: a header (format version, the table
+# signature it was taken at, journal state, row count and the first
+# SNAPSHOT_HEAD_ROWS rows) followed by one list of values per column. The
+# header's length comes first, so it can be read alone and the rest in
+# one read (marshal.load on a file reads it in small pieces).
+_SNAPSHOT_VERSION = 1
+_snapshot_signatures = {}   # filename -> signature of its snapshot on disk
+
+
+def _snapshot_path(filename):
+    return get_file_path(f'.{filename}.snapshot')
+
+
+def _snapshot_header(filename, signature):
+    """(open file positioned after the header, header) if filename has a
+    snapshot taken at signature, else None."""
+    if not SNAPSHOTS_ENABLED:
+        return None
+    try:
+        f = open(_snapshot_path(filename), mode='rb')
+    except FileNotFoundError:
+        return None
+    try:
+        size = int.from_bytes(f.read(8), 'little')
+        head = marshal.loads(f.read(size))
+        if (isinstance(head, dict) and head.get("version") == _SNAPSHOT_VERSION
+                and head.get("signature") == signature):
+            _snapshot_signatures[filename] = signature
+            return f, head
+    except (EOFError, ValueError, TypeError):
+        pass    # torn, or written by another Python version
+    f.close()
+    return None
+
+
+def _read_snapshot(filename, signature):
+    header = _snapshot_header(filename, signature)
+    if header is None:
+        return None
+    f, head = header
+    with f:
+        try:
+            columns = marshal.loads(f.read())
+        except (EOFError, ValueError, TypeError):
+            return None
+        instrument.count(rows=head["count"], read=f.tell())
+    table = Table.from_columns(list(head["headers"]), columns, signature)
+    table.journal_entries = head["journal_entries"]
+    table.journal_created = head["journal_created"]
+    return table
+
+
+def _write_snapshot(filename, table):
+    """Save table as the snapshot of its current signature. A cache only:
+    nothing is synced, and a failed write leaves no snapshot behind."""
+    if (not SNAPSHOTS_ENABLED or len(table.rows) < SNAPSHOT_MIN_ROWS
+            or _snapshot_signatures.get(filename) == table.signature):
+        return
+    headers = table.headers
+    head = {
+        "version": _SNAPSHOT_VERSION,
+        "signature": table.signature,
+        "journal_entries": table.journal_entries,
+        "journal_created": table.journal_created,
+        "headers": headers,
+        "count": len(table.rows),
+        "head": [[row.get(h) for h in headers] for row in table.rows[:SNAPSHOT_HEAD_ROWS]],
+    }
+    columns = [table.store.column_values(h) for h in headers]
+    path = _snapshot_path(filename)
+    tmp_path = path + '.tmp'
+    try:
+        header = marshal.dumps(head)
+        with open(tmp_path, mode='wb') as f:
+            f.write(len(header).to_bytes(8, 'little'))
+            f.write(header)
+            marshal.dump(columns, f)
+            instrument.count(rows=len(table.rows), written=f.tell())
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return
+    _snapshot_signatures[filename] = table.signature
+
+
+def save_snapshots():
+    """Snapshot every loaded table that changed since its last snapshot;
+    call before exiting so the next start is fast."""
+    for filename, table in list(_tables.items()):
+        if table.signature == _table_signature(filename):
+            _write_snapshot(filename, table)
+
+
+# ----------------------------------------------------------------------
+# Write-ahead journal
+# ----------------------------------------------------------------------
+def _apply_entry(table, entry):
+    """Apply one journal record to the in-memory table. Used both for live
+    mutations and when replaying the journal after a load. Returns the rows
+    it inserted, updated or deleted."""
+    op = entry["op"]
+    fields = entry.get("fields", {})
+    if op == "insert":
+        return [table.insert({h: fields.get(h, '') for h in table.headers})]
+
+    column, pk = entry["column"], str(entry["pk"])
+    matches = [row for row in table.lookup(column, pk) if str(row[column]) == pk]
+    if op == "update":
+        matches = matches[:1]
+        for row in matches:
+            table.update(row, {k: v for k, v in fields.items() if k in table.headers})
+    elif op == "delete":
+        table.remove(matches)
+    return matches
+
+
+def _replay_journal(filename, table):
+    path = _journal_path(filename)
+    with open(path, mode='rb') as f:
+        data = f.read()
+    # Only newline-terminated lines were written completely
+    lines = data.split(b"\n")
+    instrument.count(rows=max(len(lines) - 2, 0), read=len(data))
+    try:
+        header = json.loads(lines[0]) if len(lines) > 1 else None
+    except ValueError:
+        header = None
+
+    if not header or not _journal_base_matches(filename, table, header):
+        # Either the CSV was compacted and we crashed before removing the
+        # log, or the CSV was replaced behind our back. The log no longer
+        # describes this file, so drop it.
+        _discard_journal(filename)
+        table.signature = _table_signature(filename)
+        return
+
+    table.journal_created = header.get("created", time.time())
+    good = len(lines[0]) + 1
+    for line in lines[1:-1]:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            break  # torn write from a crash; everything before it is good
+        _apply_entry(table, entry)
+        table.journal_entries += 1
+        good += len(line) + 1
+
+    if good < len(data):
+        # Cut the torn tail off before anything is appended, or the next
+        # entry would be glued onto it and lost on the next replay
+        with open(path, mode='r+b') as f:
+            f.truncate(good)
+            _sync(f)
+        table.signature = _table_signature(filename)
+
+
+def _file_digest(file_path):
+    """Hash of a file's contents, or None if it does not exist."""
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(file_path, mode='rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+            instrument.count(read=f.tell())
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def _journal_base(filename, table):
+    """What a new journal header records about the CSV it applies to."""
+    base = table.signature[0]
+    return {"size": base[1] if base else None,
+            "digest": _file_digest(get_file_path(filename))}
+
+
+def _journal_base_matches(filename, table, header):
+    base = table.signature[0]
+    if "digest" not in header:
+        # Written before journals named the CSV's contents
+        return header.get("base") == (list(base) if base else None)
+    if header.get("size") != (base[1] if base else None):
+        return False
+    return header["digest"] == _file_digest(get_file_path(filename))
+
+
+def _discard_journal(filename):
+    try:
+        os.remove(_journal_path(filename))
+    except FileNotFoundError:
+        pass
+
+
+def _journal(filename, table, entry):
+    """Persist a mutation that has already been applied to table."""
+    _journal_many(filename, table, [entry])
+
+
+def _journal_many(filename, table, entries):
+    if not JOURNAL_ENABLED or _is_staged(filename):
+        # A staged rewrite replaces the file and drops its journal at
+        # commit, so the change has to be part of the rewrite
+        _write_rows(filename, table.headers, table.store.records())
+        _touch_table(filename, table)
+        return
+
+    try:
+        with open(_journal_path(filename), mode='a', encoding='utf-8', newline='') as f:
+            start = f.tell()
+            if table.journal_created is None:
+                table.journal_created = time.time()
+                header = dict(_journal_base(filename, table), created=table.journal_created)
+                f.write(json.dumps(header) + "\n")
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+            instrument.count(rows=len(entries), written=f.tell() - start)
+            _sync(f)
+    except Exception:
+        invalidate_cache(filename)
+        raise
+    table.journal_entries += len(entries)
+    _touch_table(filename, table)
+
+    # Inside a transaction a compaction would only be staged and the
+    # journal kept until commit, so every later write would stage another
+    # full copy; transaction() compacts once at the end instead.
+    if _staged is None and _compaction_due(table):
+        compact(filename)
+
+
+def _compaction_due(table):
+    return table.journal_created is not None and (
+        table.journal_entries >= JOURNAL_MAX_ENTRIES
+        or time.time() - table.journal_created >= JOURNAL_MAX_AGE)
+
+
+def compact(filename):
+    """Fold the journal into the CSV and remove it."""
+    table = load_table(filename)
+    if table.journal_created is None:
+        return
+    _write_rows(filename, table.headers, table.store.records())
+
+
+def compact_journals():
+    """Fold the journal of every loaded table into its CSV; call before
+    exiting so no confirmed edit is left depending on the log."""
+    for filename, table in list(_tables.items()):
+        if table.journal_created is not None:
+            compact(filename)
+
+
+def invalidate_cache(filename=None):
+    if filename is None:
+        _tables.clear()
+    else:
+        _tables.pop(filename, None)
+
+
 def read_data(filename):
+    # Callers are free to mutate what they get back, so hand out copies
+    # and keep the cached rows pristine.
+    return load_table(filename).store.records()
+
+def _sync(f):
+    if FSYNC_WRITES:
+        f.flush()
+        os.fsync(f.fileno())
+
+def _sync_dir():
+    if FSYNC_WRITES and os.name == 'posix':
+        fd = os.open(DATA_DIR, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+# ----------------------------------------------------------------------
+# Atomic file replacement
+# ----------------------------------------------------------------------
+# Full rewrites go to a temp file in DATA_DIR which is then renamed over
+# the original, so readers see either the old file or the new one, never
+# half of it. Inside transaction() the renames are held back and done as
+# one group, with a manifest that lets the next start finish the group if
+# we crash halfway through it.
+_COMMIT_MANIFEST = '.pending_commit'
+_staged = None
+_recovered = False
+
+
+def _is_staged(filename):
+    """Whether the open transaction holds a rewrite of filename."""
+    return _staged is not None and any(name == filename for _, name in _staged)
+
+
+def _write_rows(filename, headers, rows):
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{filename}.', suffix='.tmp', dir=get_file_path(''))
+    try:
+        # mkstemp creates owner-only files; keep the original's permissions.
+        try:
+            os.chmod(tmp_path, os.stat(get_file_path(filename)).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        with open(fd, mode='w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=headers)
+            writer.writeheader()
+            writer.writerows(rows)
+            instrument.count(rows=len(rows), written=f.tell())
+            _sync(f)
+    except Exception:
+        os.remove(tmp_path)
+        invalidate_cache(filename)
+        raise
+
+    if _staged is not None:
+        # A later rewrite of the same file supersedes the staged one
+        for i, (old_tmp, staged_name) in enumerate(_staged):
+            if staged_name == filename:
+                os.remove(get_file_path(old_tmp))
+                del _staged[i]
+                break
+        _staged.append((os.path.basename(tmp_path), filename))
+    else:
+        _commit([(os.path.basename(tmp_path), filename)])
+
+
+def _commit(staged):
+    manifest = get_file_path(_COMMIT_MANIFEST)
+    if len(staged) > 1:
+        with open(manifest, mode='w', encoding='utf-8') as f:
+            json.dump(staged, f)
+            _sync(f)
+    for tmp_name, filename in staged:
+        os.replace(get_file_path(tmp_name), get_file_path(filename))
+        # The rewritten file holds everything the journal did.
+        _discard_journal(filename)
+    _sync_dir()
+    if len(staged) > 1:
+        os.remove(manifest)
+    for _, filename in staged:
+        table = _tables.get(filename)
+        if table is not None:
+            table.journal_entries = 0
+            table.journal_created = None
+            _touch_table(filename, table)
+
+
+def _recover_commit():
+    """Finish a group commit that was interrupted by a crash."""
+    global _recovered
+    _recovered = True
+    manifest = get_file_path(_COMMIT_MANIFEST)
+    if not os.path.exists(manifest):
+        return
+    with open(manifest, mode='r', encoding='utf-8') as f:
+        staged = json.load(f)
+    for tmp_name, filename in staged:
+        if os.path.exists(get_file_path(tmp_name)):
+            os.replace(get_file_path(tmp_name), get_file_path(filename))
+            _discard_journal(filename)
+        invalidate_cache(filename)
+    _sync_dir()
+    os.remove(manifest)
+
+
+@contextmanager
+def transaction():
+    """Group every full-file rewrite made inside the block into one commit.
+    If the block raises, none of the files are replaced."""
+    global _staged
+    if _staged is not None:
+        yield
+        return
+
+    _staged = []
+    try:
+        yield
+    except BaseException:
+        for tmp_name, filename in _staged:
+            os.remove(get_file_path(tmp_name))
+            invalidate_cache(filename)
+        raise
+    else:
+        _commit(_staged)
+    finally:
+        _staged = None
+    for filename, table in list(_tables.items()):
+        if _compaction_due(table):
+            compact(filename)
+
+def _ends_with_newline(file_path):
+    with open(file_path, mode='rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) in (b'\n', b'\r')
+
+def _append_rows(filename, headers, rows):
+    """Write rows at the end of an existing file without touching the rest."""
     file_path = get_file_path(filename)
-    if not os.path.exists(file_path):
-        return []
-    with open(file_path, mode='r', encoding='utf-8', newline='') as file:
-        reader = csv.DictReader(file, skipinitialspace=True)
-        return list(reader)
+    try:
+        needs_newline = not _ends_with_newline(file_path)
+        with open(file_path, mode='a', newline='', encoding='utf-8') as f:
+            start = f.tell()
+            if needs_newline:
+                f.write('\r\n')
+            writer = csv.DictWriter(f, fieldnames=headers)
+            writer.writerows(rows)
+            instrument.count(rows=len(rows), written=f.tell() - start)
+            _sync(f)
+    except Exception:
+        invalidate_cache(filename)
+        raise
 
 def save_data(filename, headers, data):
-    full_path = get_file_path(filename)
     clean_data = []
     for row in data:
         clean_row = {h: row.get(h, '') for h in headers}
         clean_data.append(clean_row)
 
-    with open(full_path, mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(clean_data)
+    _write_rows(filename, headers, clean_data)
+    table = Table(list(headers), clean_data, None)
+    _touch_table(filename, table)
+    _tables[filename] = table
+
+def _write_header(filename, headers):
+    """Replace a file holding no rows with just a header row. Done at once
+    even inside a transaction: there is nothing in it to roll back to, and
+    rows appended after it must not land in a file a staged rewrite will
+    replace at commit."""
+    global _staged
+    staged, _staged = _staged, None
+    try:
+        _write_rows(filename, headers, [])
+    finally:
+        _staged = staged
+    invalidate_cache(filename)
 
 def append_row(filename, suggested_headers, new_row_dict):
-    data = read_data(filename)
-    if data:
-        existing_headers = list(data[0].keys())
+    table = load_table(filename)
+    if table.rows:
+        existing_headers = table.headers
     else:
         existing_headers = suggested_headers
 
     clean_new = {h: new_row_dict.get(h, '') for h in existing_headers}
-    data.append(clean_new)
-    save_data(filename, existing_headers, data)
+    if table.signature is None or table.headers != existing_headers:
+        # No file yet, or its header row is missing/different: write it whole.
+        save_data(filename, existing_headers, table.rows + [clean_new])
+        return dict(clean_new)
+    if table.journal_created is not None or _is_staged(filename):
+        # Pending journal records must stay ordered before this row.
+        entry = {"op": "insert", "fields": clean_new}
+        _apply_entry(table, entry)
+        _journal(filename, table, entry)
+        return dict(clean_new)
+    _append_rows(filename, table.headers, [clean_new])
+    table.insert(clean_new)
+    _touch_table(filename, table)
+    return dict(clean_new)
 
-def update_row(filename, pk_value, updated_dict):
-    data = read_data(filename)
-    if not data:
+def apply_batch(filename, inserts, updates):
+    """Insert new rows and overwrite existing ones in a single write.
+
+    updates is a list of (pk_value, row) pairs. Pure inserts are appended
+    to the CSV; anything involving updates goes through the journal."""
+    table = load_table(filename)
+    columns = SCHEMA[filename]['columns']
+    pk = SCHEMA[filename]['pk']
+    if table.signature[0] is None or (table.headers != columns and not table.rows):
+        # Start the file with its header and append to it like any other,
+        # rather than rewriting the whole table for every batch
+        _write_header(filename, columns)
+        table = load_table(filename)
+
+    if not updates and table.journal_created is None and not _is_staged(filename):
+        rows = [{h: row.get(h, '') for h in table.headers} for row in inserts]
+        _append_rows(filename, table.headers, rows)
+        for row in rows:
+            table.insert(row)
+        _touch_table(filename, table)
         return
+
+    entries = [{"op": "update", "column": pk, "pk": str(pk_value), "fields": dict(row)}
+               for pk_value, row in updates]
+    entries += [{"op": "insert", "fields": dict(row)} for row in inserts]
+    for entry in entries:
+        _apply_entry(table, entry)
+    _journal_many(filename, table, entries)
+
+def update_row(filename, pk_value, updated_dict):
+    """Update the row keyed pk_value; returns a copy of it, or None if there
+    is no such row."""
+    table = load_table(filename)
+    if not table.rows:
+        return None
     id_field = list(updated_dict.keys())[0]
-    headers = list(data[0].keys())
-    for i, row in enumerate(data):
-        if str(row[id_field]) == str(pk_value):
-            for key, value in updated_dict.items():
-                if key in headers:
-                    row[key] = value
-            data[i] = row
-            break
-    save_data(filename, headers, data)
+    entry = {"op": "update", "column": id_field, "pk": str(pk_value),
+             "fields": dict(updated_dict)}
+    changed = _apply_entry(table, entry)
+    if not changed:
+        return None
+    _journal(filename, table, entry)
+    return dict(changed[0])
 
 def is_unique(filename, column_name, new_value):
-    current_data = read_data(filename)
-    normalized_new = str(new_value).strip().lower()
-    return not any(
-        str(row.get(column_name, "")).strip().lower() == normalized_new
-        for row in current_data
-    )
+    return normalize_key(new_value) not in load_table(filename).index(column_name)
 
 def is_unique_excluding(filename, column, new_value, exclude_value):
-    data = read_data(filename)
-    normalized_new = str(new_value).strip().lower()
-    normalized_exclude = str(exclude_value).strip().lower()
-    for row in data:
-        row_val = str(row.get(column, "")).strip().lower()
-        if row_val == normalized_new and row_val != normalized_exclude:
-            return False
-    return True
+    normalized_new = normalize_key(new_value)
+    if normalized_new == normalize_key(exclude_value):
+        return True
+    return normalized_new not in load_table(filename).index(column)
 
 def is_valid_student_id(student_id):
     return bool(re.match(r"^\d{4}-\d{4}$", student_id))
@@ -98,117 +775,202 @@ def validate_student(student_id, gender, program_code):
         return False, "This ID already exists."
     if gender not in GENDER_OPTIONS:
         return False, "Use M, F, or O."
-    programs = read_data('programs.csv')
-    normalized_program = str(program_code).strip().lower()
-    if not any(
-        str(p.get('program_code', '')).strip().lower() == normalized_program
-        for p in programs
-    ):
+    if not parent_exists('programs.csv', 'program_code', program_code):
         return False, f"Program '{program_code}' not found."
     return True, "Valid"
 
 def parent_exists(parent_filename, parent_column, value):
-    data = read_data(parent_filename)
-    normalized_value = str(value).strip().lower()
-    return any(
-        str(row.get(parent_column, "")).strip().lower() == normalized_value
-        for row in data
-    )
+    return normalize_key(value) in load_table(parent_filename).index(parent_column)
 
 def delete_record(filename, pk_column, pk_value):
-    data = read_data(filename)
-    if not data:
-        return
-    headers = list(data[0].keys())
-    new_data = [row for row in data if str(row[pk_column]) != str(pk_value)]
-    save_data(filename, headers, new_data)
+    """Delete the rows keyed pk_value; returns copies of them."""
+    table = load_table(filename)
+    if not table.rows:
+        return []
+    entry = {"op": "delete", "column": pk_column, "pk": str(pk_value)}
+    removed = _apply_entry(table, entry)
+    if removed:
+        _journal(filename, table, entry)
+    return [dict(row) for row in removed]
+
+# ----------------------------------------------------------------------
+# Cascades
+# ----------------------------------------------------------------------
+# Referential actions follow SCHEMA: changing a key rewrites the foreign
+# key of the rows that point at it, deleting a row sets their foreign key
+# to MISSING_PARENT. Affected children are found through the reverse
+# index on their foreign key column, and every touched file is written
+# in a single transaction.
+MISSING_PARENT = "N/A"
+
+
+def child_tables(filename):
+    """(child filename, foreign key column) pairs that reference filename."""
+    return [
+        (child, spec['parent'][0])
+        for child, spec in SCHEMA.items()
+        if spec['parent'] and spec['parent'][1] == filename
+    ]
+
+
+def _matching(table, column, value):
+    return [row for row in table.lookup(column, value) if row[column] == value]
+
+
+def _persist(changes):
+    touched = [filename for filename, count in changes.items() if count]
+    try:
+        with transaction():
+            for filename in touched:
+                table = load_table(filename)
+                headers = table.headers or SCHEMA[filename]['columns']
+                _write_rows(filename, headers, table.store.records())
+    except Exception:
+        for filename in touched:
+            invalidate_cache(filename)
+        raise
+    return changes
+
+
+def update_cascade(filename, old_pk, updated_dict):
+    """Update the row keyed old_pk and carry a key change down to the rows
+    that reference it. Returns {filename: rows changed}."""
+    pk = SCHEMA[filename]['pk']
+    new_pk = updated_dict[pk]
+    table = load_table(filename)
+    fields = {k: v for k, v in updated_dict.items() if k in SCHEMA[filename]['columns']}
+    matches = _matching(table, pk, old_pk)[:1]
+    for row in matches:
+        table.update(row, fields)
+    changes = {filename: len(matches)}
+
+    if old_pk != new_pk:
+        for child, fk_col in child_tables(filename):
+            child_table = load_table(child)
+            children = _matching(child_table, fk_col, old_pk)
+            for row in children:
+                child_table.update(row, {fk_col: new_pk})
+            changes[child] = len(children)
+    return _persist(changes)
+
+
+def delete_cascade(filename, pk_value):
+    """Delete the row keyed pk_value and detach the rows that reference it.
+    Returns {filename: rows changed}."""
+    table = load_table(filename)
+    doomed = _matching(table, SCHEMA[filename]['pk'], pk_value)
+    table.remove(doomed)
+    changes = {filename: len(doomed)}
+
+    for child, fk_col in child_tables(filename):
+        child_table = load_table(child)
+        orphans = _matching(child_table, fk_col, pk_value)
+        for row in orphans:
+            child_table.update(row, {fk_col: MISSING_PARENT})
+        changes[child] = len(orphans)
+    return _persist(changes)
+
 
 def update_college_cascade(old_code, updated_dict):
-    new_code = updated_dict['college_code']
-    new_name = updated_dict['college_name']
-
-    colleges = read_data('colleges.csv')
-    for college in colleges:
-        if college['college_code'] == old_code:
-            college['college_code'] = new_code
-            college['college_name'] = new_name
-            break
-    save_data('colleges.csv', ['college_code', 'college_name'], colleges)
-
-    if old_code != new_code:
-        programs = read_data('programs.csv')
-        updated = False
-        for prog in programs:
-            if prog['college_code'] == old_code:
-                prog['college_code'] = new_code
-                updated = True
-        if updated:
-            save_data('programs.csv', ['program_code', 'program_name', 'college_code'], programs)
+    return update_cascade('colleges.csv', old_code, {
+        'college_code': updated_dict['college_code'],
+        'college_name': updated_dict['college_name']
+    })
 
 def delete_college_cascade(college_code):
-    colleges = read_data('colleges.csv')
-    colleges = [c for c in colleges if c['college_code'] != college_code]
-    save_data('colleges.csv', ['college_code', 'college_name'], colleges)
-
-    programs = read_data('programs.csv')
-    updated = False
-    for prog in programs:
-        if prog['college_code'] == college_code:
-            prog['college_code'] = "N/A"
-            updated = True
-    if updated:
-        save_data('programs.csv', ['program_code', 'program_name', 'college_code'], programs)
+    return delete_cascade('colleges.csv', college_code)
 
 def update_program_cascade(old_code, updated_dict):
-    new_code = updated_dict["program_code"]
-    new_name = updated_dict["program_name"]
-    new_college = updated_dict["college_code"]
-
-    programs = read_data("programs.csv")
-    for prog in programs:
-        if prog["program_code"] == old_code:
-            prog["program_code"] = new_code
-            prog["program_name"] = new_name
-            prog["college_code"] = new_college
-            break
-
-    save_data(
-        "programs.csv",
-        ["program_code", "program_name", "college_code"],
-        programs
-    )
-
-    # Update students only if the program code itself changed
-    if old_code != new_code:
-        students = read_data("students.csv")
-        updated = False
-        for s in students:
-            if s["program_code"] == old_code:
-                s["program_code"] = new_code
-                updated = True
-
-        if updated:
-            headers = [
-                "student_id",
-                "first_name",
-                "last_name",
-                "year_level",
-                "gender",
-                "program_code"
-            ]
-            save_data("students.csv", headers, students)
+    return update_cascade('programs.csv', old_code, {
+        'program_code': updated_dict['program_code'],
+        'program_name': updated_dict['program_name'],
+        'college_code': updated_dict['college_code']
+    })
 
 def delete_program_cascade(program_code):
-    programs = read_data('programs.csv')
-    programs = [p for p in programs if p['program_code'] != program_code]
-    save_data('programs.csv', ['program_code', 'program_name', 'college_code'], programs)
-
-    students = read_data('students.csv')
-    updated = False
-    for s in students:
-        if s['program_code'] == program_code:
-            s['program_code'] = "N/A"
-            updated = True
-    if updated:
-        headers = ['student_id', 'first_name', 'last_name', 'year_level', 'gender', 'program_code']
-        save_data('students.csv', headers, students)
\ No newline at end of file
+    return delete_cascade('programs.csv', program_code)
+
+# ----------------------------------------------------------------------
+# Validated saves
+# ----------------------------------------------------------------------
+def save_record(filename, record, old_pk=None):
+    """Validate record and add it, or with old_pk replace the record keyed
+    old_pk (carrying a key change down to its children). record must hold
+    every column of the table.
+
+    Returns (error message, None) if the record is rejected, else
+    (None, the record as saved)."""
+    spec = SCHEMA[filename]
+    pk_col = spec['pk']
+    record = {col: str(record.get(col, '')).strip() for col in spec['columns']}
+    if any(value == '' for value in record.values()):
+        return "All fields are required.", None
+    new_pk = record[pk_col]
+
+    if old_pk is None:
+        if filename == 'colleges.csv':
+            success, msg = validate_college(new_pk)
+        elif filename == 'programs.csv':
+            success, msg = validate_program(new_pk, record['college_code'])
+        else:
+            success, msg = validate_student(new_pk, record['gender'], record['program_code'])
+        if not success:
+            return msg, None
+        return None, append_row(filename, spec['columns'], record)
+
+    # If the key changed, ensure the new one isn't already taken
+    if old_pk != new_pk and not is_unique_excluding(filename, pk_col, new_pk, old_pk):
+        return f"{pk_col.replace('_', ' ').title()} '{new_pk}' already exists.", None
+
+    # Validate FK relationships before touching the file
+    if filename == 'programs.csv':
+        college_code = record['college_code']
+        if not parent_exists('colleges.csv', 'college_code', college_code):
+            return f"College '{college_code}' does not exist.", None
+    elif filename == 'students.csv':
+        if not is_valid_student_id(new_pk):
+            return "Student ID must be in YYYY-NNNN format.", None
+        if record['gender'] not in GENDER_OPTIONS:
+            return "Gender must be M, F, or O.", None
+        prog = record['program_code']
+        if not parent_exists('programs.csv', 'program_code', prog):
+            return f"Program '{prog}' does not exist.", None
+
+    if not child_tables(filename):
+        return None, update_row(filename, old_pk, record)
+    update_cascade(filename, old_pk, record)
+    # Cascades report counts; read back the record itself
+    saved = load_table(filename).lookup(pk_col, new_pk)
+    return None, dict(saved[0]) if saved else None
+
+# ----------------------------------------------------------------------
+# Backend selection
+# ----------------------------------------------------------------------
+# The validators and cascade wrappers above look up the storage functions
+# through this module's globals, so rebinding them here is enough for them
+# to run against SQLite as well.
+if BACKEND == 'sqlite':
+    from sqlite_backend import (  # noqa: E402
+        load_table, peek_table, save_snapshots, invalidate_cache, compact, transaction,
+        read_data, save_data, append_row, apply_batch, update_row, delete_record,
+        is_unique, is_unique_excluding, parent_exists,
+        update_cascade, delete_cascade
+    )
+
+# ----------------------------------------------------------------------
+# Instrumentation
+# ----------------------------------------------------------------------
+# With SSIS_PROFILE set every entry point is timed (see instrument.py).
+# This runs after the backend is chosen so either one is covered, and
+# since the rebound globals are what the validators and cascades call,
+# their inner calls are timed as well.
+ENTRY_POINTS = [
+    'load_table', 'peek_table', 'save_snapshots', 'read_data', 'save_data', 'append_row', 'apply_batch',
+    'update_row', 'delete_record', 'compact', 'compact_journals', 'is_unique', 'is_unique_excluding',
+    'parent_exists', 'validate_college', 'validate_program', 'validate_student',
+    'update_cascade', 'delete_cascade', 'update_college_cascade',
+    'delete_college_cascade', 'update_program_cascade', 'delete_program_cascade',
+    'save_record',
+]
+for _name in ENTRY_POINTS:
+    globals()[_name] = instrument.timed(f"db.{_name}")(globals()[_name])
@@ -1,9 +1,17 @@
 import tkinter as tk
 import os
-import csv
+import queue
 import textwrap
+import threading
+import traceback
+from collections import OrderedDict
 from tkinter import ttk, messagebox, filedialog
 import database as db
+import importer
+import instrument
+from columnar import ColumnarTable, ColumnLengths, longest_values
+from search import SearchIndex, SearchSession
+from sorting import SortCache
 
 # ----------------------------------------------------------------------
 # Constants / Configuration
@@ -28,9 +36,18 @@ class Config:
     TREE_CHAR_WIDTH = 9
     MAX_COL_WIDTH = 350
     MIN_COL_WIDTH = 120
+    WRAP_WIDTH = 35
 
     # Pagination
     DEFAULT_ROWS_PER_PAGE = 10
+    # Rows shown from the table's snapshot while a view is loading
+    PREVIEW_ROWS = 200
+
+    # Continuous scrolling: rows moved per wheel notch, windows of rows
+    # prepared on either side of the visible one, display strings kept
+    SCROLL_WHEEL_ROWS = 3
+    SCROLL_PREFETCH_WINDOWS = 1
+    DISPLAY_CACHE_SIZE = 2000
 
     # Window constraints
     MIN_ROWS_VISIBLE = 5
@@ -89,18 +106,31 @@ class Config:
     GENDER_OPTIONS = ["M", "F", "O"]
     YEAR_OPTIONS = ["1", "2", "3", "4"]
 
+    # Import
+    IMPORT_ERRORS_SHOWN = 15
+
+    # Search results are cached per query, so a short debounce is enough
+    SEARCH_DEBOUNCE_MS = 80
+
+    # Stats panel and log (only with SSIS_PROFILE set, see instrument.py)
+    STATS_TOGGLE_KEY = "<F12>"
+    STATS_REFRESH_MS = 1000
+    STATS_ROWS_SHOWN = 15
+    STATS_LOG_INTERVAL_MS = 60000
+
 
 # ----------------------------------------------------------------------
 # Pagination Widget
 # ----------------------------------------------------------------------
 class PaginationBar(tk.Frame):
-    def __init__(self, parent, on_prev, on_next, on_jump, *args, **kwargs):
+    def __init__(self, parent, on_prev, on_next, on_jump, on_toggle_scroll, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
         self.configure(bg=Config.BG_DARK)
 
         self.on_prev = on_prev
         self.on_next = on_next
         self.on_jump = on_jump
+        self.on_toggle_scroll = on_toggle_scroll
 
         self.current_page = 1
         self.total_pages = 1
@@ -108,32 +138,42 @@ class PaginationBar(tk.Frame):
         self.rows_per_page = Config.DEFAULT_ROWS_PER_PAGE
 
         # Create widgets
+        self.mode_btn = tk.Button(
+            self, text="Scroll view", bg=Config.BG_INPUT, fg=Config.FG_LIGHT,
+            relief="flat", padx=15, command=self.on_toggle_scroll, cursor="hand2"
+        )
+        self.mode_btn.pack(side="right", padx=(0, 20))
+
+        # Page controls share a frame so scroll mode can hide them together
+        self.page_controls = tk.Frame(self, bg=Config.BG_DARK)
+        self.page_controls.pack(side="right")
+
         self.next_btn = tk.Button(
-            self, text="Next >", bg=Config.BG_INPUT, fg=Config.FG_LIGHT,
+            self.page_controls, text="Next >", bg=Config.BG_INPUT, fg=Config.FG_LIGHT,
             relief="flat", padx=15, command=self._next, cursor="hand2"
         )
         self.next_btn.pack(side="right", padx=20)
 
         self.prev_btn = tk.Button(
-            self, text="< Prev", bg=Config.BG_INPUT, fg=Config.FG_LIGHT,
+            self.page_controls, text="< Prev", bg=Config.BG_INPUT, fg=Config.FG_LIGHT,
             relief="flat", padx=15, command=self._prev, cursor="hand2"
         )
         self.prev_btn.pack(side="right", padx=2)
 
         self.page_label = tk.Label(
-            self, text="Page 1 of 1", bg=Config.BG_DARK, fg=Config.FG_MUTED
+            self.page_controls, text="Page 1 of 1", bg=Config.BG_DARK, fg=Config.FG_MUTED
         )
         self.page_label.pack(side="right", padx=10)
 
         self.jump_entry = tk.Entry(
-            self, width=5, bg=Config.BG_INPUT, fg=Config.FG_LIGHT,
+            self.page_controls, width=5, bg=Config.BG_INPUT, fg=Config.FG_LIGHT,
             relief="flat", insertbackground=Config.ACCENT, justify="center"
         )
         self.jump_entry.pack(side="right", padx=5)
         self.jump_entry.bind("<Return>", self._jump)
 
         tk.Label(
-            self, text="Go to:", bg=Config.BG_DARK, fg=Config.FG_MUTED,
+            self.page_controls, text="Go to:", bg=Config.BG_DARK, fg=Config.FG_MUTED,
             font=(Config.FONT_FAMILY, 9)
         ).pack(side="right")
 
@@ -176,6 +216,14 @@ class PaginationBar(tk.Frame):
         self.info_label.config(text=f"Showing {start_num} to {end_num} of {total_rows} entries")
         self._update_buttons_state()
 
+    def set_scroll_mode(self, enabled):
+        if enabled:
+            self.page_controls.pack_forget()
+            self.mode_btn.config(text="Page view")
+        else:
+            self.page_controls.pack(side="right")
+            self.mode_btn.config(text="Scroll view")
+
     def _update_buttons_state(self):
         if self.current_page <= 1:
             self.prev_btn.config(state="disabled", bg="#1a1a1a", fg="#4a4a4a")
@@ -188,9 +236,251 @@ class PaginationBar(tk.Frame):
             self.next_btn.config(state="normal", bg=Config.BG_INPUT, fg=Config.FG_LIGHT)
 
 
+# ----------------------------------------------------------------------
+# Stats Panel
+# ----------------------------------------------------------------------
+def _format_bytes(n):
+    for unit in ("B", "K", "M"):
+        if n < 1024:
+            return f"{n:.0f}{unit}"
+        n /= 1024
+    return f"{n:.1f}G"
+
+
+class StatsPanel(tk.Frame):
+    """Overlay listing the instrumented calls that took the most time.
+    Refreshes itself while shown."""
+
+    COLUMNS = f"{'call':<30}{'calls':>7}{'total ms':>10}{'mean':>8}{'max':>8}{'rows':>9}{'read':>8}{'written':>8}"
+
+    def __init__(self, parent, *args, **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        self.configure(bg=Config.BG_SIDEBAR, bd=1, relief="solid")
+        self._after_id = None
+
+        header = tk.Frame(self, bg=Config.BG_SIDEBAR)
+        header.pack(fill="x", padx=10, pady=(8, 0))
+        tk.Label(
+            header, text="Performance", bg=Config.BG_SIDEBAR, fg=Config.ACCENT,
+            font=(Config.FONT_FAMILY, Config.FONT_SIZE_NORMAL, "bold")
+        ).pack(side="left")
+        tk.Button(
+            header, text="Reset", bg=Config.BG_INPUT, fg=Config.FG_LIGHT,
+            relief="flat", padx=10, command=self._reset, cursor="hand2"
+        ).pack(side="right")
+
+        self.text = tk.Label(
+            self, text="", justify="left", anchor="w",
+            bg=Config.BG_SIDEBAR, fg=Config.FG_LIGHT, font=("Courier", 9)
+        )
+        self.text.pack(fill="both", padx=10, pady=8)
+
+    @property
+    def shown(self):
+        return self.winfo_ismapped()
+
+    def toggle(self):
+        if self.shown:
+            self.place_forget()
+            if self._after_id:
+                self.after_cancel(self._after_id)
+                self._after_id = None
+        else:
+            self.place(relx=1.0, rely=0.0, x=-20, y=70, anchor="ne")
+            self.lift()
+            self.refresh()
+
+    def refresh(self):
+        stats = sorted(instrument.snapshot().items(), key=lambda kv: -kv[1]['seconds'])
+        lines = [self.COLUMNS]
+        for name, s in stats[:Config.STATS_ROWS_SHOWN]:
+            lines.append(
+                f"{name[:29]:<30}{s['calls']:>7}{s['seconds'] * 1e3:>10.1f}"
+                f"{s['seconds'] * 1e3 / s['calls']:>8.1f}{s['max_seconds'] * 1e3:>8.1f}"
+                f"{s['rows']:>9}{_format_bytes(s['bytes_read']):>8}{_format_bytes(s['bytes_written']):>8}"
+            )
+        if not stats:
+            lines.append("No calls recorded yet.")
+        self.text.config(text="\n".join(lines))
+        self._after_id = self.after(Config.STATS_REFRESH_MS, self.refresh)
+
+    def _reset(self):
+        instrument.reset()
+        if self._after_id:
+            self.after_cancel(self._after_id)
+        self.refresh()
+
+
+# ----------------------------------------------------------------------
+# Table Rendering
+# ----------------------------------------------------------------------
+class VirtualTable:
+    """Shows a page of records in a Treeview through a fixed pool of items.
+
+    Items are created once and their values rewritten in place, so paging,
+    sorting and searching never delete or insert Tk items except when the
+    page grows. Display strings (with long text wrapped) are cached for the
+    most recently shown records until reset()."""
+
+    def __init__(self, tree, trailing=(), cache_size=Config.DISPLAY_CACHE_SIZE):
+        self.tree = tree
+        self.trailing = tuple(trailing)   # fixed cells after the data, e.g. actions
+        self.cache_size = cache_size
+        self._items = []                  # pooled item ids, in display order
+        self._shown = []                  # record currently in each item
+        self._attached = 0
+        self._display = OrderedDict()     # id(record) -> (record, values)
+        self.derived = {}                 # computed columns shown after the record's own
+
+    def reset(self, derived=None):
+        """Forget cached display strings; call when the records change."""
+        self.derived = derived or {}
+        self._display.clear()
+        self._shown = [None] * len(self._items)
+
+    def forget(self, record):
+        """Drop a record's cached display strings after it changed."""
+        self._display.pop(id(record), None)
+        for i, shown in enumerate(self._shown):
+            if shown is record:
+                self._shown[i] = None
+
+    def display_values(self, record):
+        cached = self._display.get(id(record))
+        if cached is not None and cached[0] is record:
+            self._display.move_to_end(id(record))
+            return cached[1]
+        values = []
+        cells = list(record.values()) + [func(record) for func in self.derived.values()]
+        for val in cells:
+            text = str(val)
+            if len(text) > Config.WRAP_WIDTH:
+                text = "\n".join(textwrap.wrap(text, width=Config.WRAP_WIDTH))
+            values.append(text)
+        values = tuple(values) + self.trailing
+        self._display[id(record)] = (record, values)
+        self._display.move_to_end(id(record))
+        if len(self._display) > self.cache_size:
+            self._display.popitem(last=False)
+        return values
+
+    def show(self, records):
+        tree = self.tree
+        # Put back items hidden by a shorter page before creating new ones,
+        # so the pool stays in display order
+        for i in range(self._attached, min(len(records), len(self._items))):
+            tree.move(self._items[i], "", i)
+        while len(self._items) < len(records):
+            tag = ('evenrow',) if len(self._items) % 2 != 0 else ()
+            self._items.append(tree.insert("", "end", tags=tag))
+            self._shown.append(None)
+
+        # Hide unused items rather than deleting them
+        for i in range(len(records), self._attached):
+            tree.detach(self._items[i])
+            self._shown[i] = None
+        self._attached = len(records)
+
+        for i, record in enumerate(records):
+            if self._shown[i] is not record:
+                tree.item(self._items[i], values=self.display_values(record))
+                self._shown[i] = record
+
+    def record(self, item):
+        """The record shown in item, or None."""
+        try:
+            return self._shown[self._items.index(item)]
+        except ValueError:
+            return None
+
+
+# ----------------------------------------------------------------------
+# Background I/O
+# ----------------------------------------------------------------------
+class IOWorker:
+    """Runs storage calls on a single background thread so Tk never blocks
+    on disk. Jobs run one at a time in submission order, which keeps writes
+    ordered; callbacks are handed back to the Tk thread by polling."""
+
+    POLL_MS = 30
+
+    def __init__(self, root, on_busy_change=None):
+        self.root = root
+        self.on_busy_change = on_busy_change
+        self.pending = 0
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="ssis-io", daemon=True)
+        self._thread.start()
+        self._poll()
+
+    def submit(self, func, on_done=None, on_error=None):
+        self.pending += 1
+        if self.pending == 1 and self.on_busy_change:
+            self.on_busy_change(True)
+        self._jobs.put((func, on_done, on_error))
+
+    def post(self, callback, *args):
+        """Schedule callback(*args) on the Tk thread; safe from any thread."""
+        self._results.put((callback, args))
+
+    def shutdown(self):
+        """Let queued jobs finish, then stop the thread."""
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            func, on_done, on_error = job
+            try:
+                value = func()
+            except Exception as e:
+                traceback.print_exc()
+                self.post(self._finish, on_error or self._show_error, e)
+            else:
+                self.post(self._finish, on_done, value)
+
+    def _finish(self, callback, value):
+        self.pending -= 1
+        try:
+            if callback:
+                callback(value)
+        finally:
+            if self.pending == 0 and self.on_busy_change:
+                self.on_busy_change(False)
+
+    def _show_error(self, error):
+        messagebox.showerror("Unexpected Error", f"An error occurred:\n{str(error)}")
+
+    def _poll(self):
+        # A failing callback is reported and skipped; the pump always re-arms
+        # so later results are still delivered.
+        try:
+            while True:
+                try:
+                    callback, args = self._results.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    callback(*args)
+                except Exception as e:
+                    traceback.print_exc()
+                    self._show_error(e)
+        finally:
+            self.root.after(self.POLL_MS, self._poll)
+
+
 # ----------------------------------------------------------------------
 # Main Application Class
 # ----------------------------------------------------------------------
+def _view_rows(result, app, *args, **kwargs):
+    # Rows a handler worked on, for the instrumentation: the current view
+    return len(app.all_data_cache)
+
+
 class SSIS_APP:
     def __init__(self, root):
         self.root = root
@@ -200,14 +490,31 @@ class SSIS_APP:
         # State variables
         self.current_view = "students"
         self.all_data_cache = []
-        self.unfiltered_cache = []
+        self.search_index = SearchIndex()
+        self.search_session = SearchSession(self.search_index)
+        self.sort_cache = SortCache([])
+        self.derived = {}           # computed columns of the current view
+        self.record_index = {}      # normalized primary key -> cached record
+        self.view_table = ColumnarTable([])   # storage behind the cached records
+        self.unfiltered_cache = self.view_table.rows
+        # Column widths: the whole table's stats are patched on every edit,
+        # search results are measured once per query
+        self.column_lengths = ColumnLengths()
+        self._filtered_lengths = {}
+        self._lengths_version = None
+        self._college_join = None   # (programs signature, program -> college)
         self.current_page = 1
         self.rows_per_page = Config.DEFAULT_ROWS_PER_PAGE
         self.total_pages = 1
 
-        # Sorting
-        self.current_sort_col = None
-        self.current_sort_reverse = False
+        # Continuous scrolling replaces pages with a row offset
+        self.scroll_mode = False
+        self.scroll_offset = 0
+        self._prefetch_after_id = None
+
+        # Sorting: (column, reverse) pairs, most significant first
+        self.sort_spec = []
+        self._sort_extend = False
 
         # For debouncing search
         self._search_after_id = None
@@ -218,6 +525,12 @@ class SSIS_APP:
         # Re-entrancy guard for tree Configure events
         self._configuring = False
 
+        # Bumped on every refresh so results of a superseded load are dropped
+        self._load_generation = 0
+        # Generation of the data on screen; the full table replacing its
+        # preview arrives with the same one
+        self._shown_generation = None
+
         # Hover tracking
         self.current_hover_column = None
 
@@ -229,6 +542,15 @@ class SSIS_APP:
         # Setup UI
         self.setup_styles()
         self.create_widgets()
+
+        # All storage calls go through the I/O worker
+        self.io = IOWorker(self.root, on_busy_change=self.set_busy)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        if instrument.ENABLED:
+            self.stats_panel = StatsPanel(self.main_window)
+            self.root.bind(Config.STATS_TOGGLE_KEY, lambda e: self.stats_panel.toggle())
+            self.root.after(Config.STATS_LOG_INTERVAL_MS, self._log_stats)
         
         # Delay initial load to let UI render properly
         self.root.after(100, lambda: self.switch_view("students"))
@@ -295,6 +617,7 @@ class SSIS_APP:
             on_prev=self.prev_page,
             on_next=self.next_page,
             on_jump=self.jump_to_page,
+            on_toggle_scroll=self.toggle_scroll_mode,
             bg=Config.BG_DARK
         )
         self.pagination.pack(side="bottom", fill="x", pady=10)
@@ -312,6 +635,7 @@ class SSIS_APP:
         self.tree = ttk.Treeview(self.tree_frame, show="headings")
         self.tree.tag_configure('evenrow', background='#161b22')
         self.tree.grid(row=0, column=0, sticky="nsew")
+        self.table = VirtualTable(self.tree, trailing=("Edit", "Delete"))
 
         # Scrollbar in row 1 — hidden until needed via grid_remove/grid
         self.h_scroll = ttk.Scrollbar(self.tree_frame, orient="horizontal",
@@ -320,13 +644,24 @@ class SSIS_APP:
         self.h_scroll.grid_remove()   # hidden by default
         self.tree.configure(xscrollcommand=self.h_scroll.set)
 
+        # Vertical scrollbar for scroll mode. The tree only ever holds the
+        # visible rows, so it drives scroll_offset rather than the tree.
+        self.v_scroll = ttk.Scrollbar(self.tree_frame, orient="vertical",
+                                      command=self.on_vscroll)
+        self.v_scroll.grid(row=0, column=1, sticky="ns")
+        self.v_scroll.grid_remove()
+
         # Single Configure bind handles both resize recalc and scrollbar visibility
         self.tree.bind("<Configure>", self._on_tree_configure)
 
         # Bindings
+        self.tree.bind("<ButtonPress-1>", self._note_sort_modifier)
         self.tree.bind("<ButtonRelease-1>", self.handle_table_click)
         self.tree.bind("<Motion>", self.on_tree_motion)
         self.tree.bind("<Leave>", self.on_tree_leave)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", self.on_mousewheel)
+        self.tree.bind("<Button-5>", self.on_mousewheel)
 
     def create_sidebar(self):
         tk.Label(
@@ -389,27 +724,51 @@ class SSIS_APP:
         )
         self.import_btn.pack(side="right", padx=5)
 
+        self.busy_label = tk.Label(
+            self.top_bar, text="", bg=Config.BG_DARK, fg=Config.ACCENT,
+            font=(Config.FONT_FAMILY, Config.FONT_SIZE_NORMAL, "bold")
+        )
+        self.busy_label.pack(side="right", padx=15)
+
+    def set_busy(self, busy):
+        self.busy_label.config(text="Working..." if busy else "")
+        self.root.config(cursor="watch" if busy else "")
+
+    def on_close(self):
+        # Finish any queued writes before the process exits, fold their
+        # journals into the CSVs and leave snapshots for a fast next start
+        self.set_busy(True)
+        self.io.submit(db.compact_journals)
+        self.io.submit(db.save_snapshots)
+        self.io.shutdown()
+        instrument.log_snapshot()
+        self.root.destroy()
+
+    def _log_stats(self):
+        instrument.log_snapshot()
+        self.root.after(Config.STATS_LOG_INTERVAL_MS, self._log_stats)
+
     # ------------------------------------------------------------------
     # Data Loading & Pagination
     # ------------------------------------------------------------------
-    def load_table_data(self, view_type, refresh_cache=True):
+    @instrument.timed("gui.load_table_data", rows=_view_rows)
+    def load_table_data(self, view_type, refresh_cache=True, preview=False):
         if refresh_cache:
-            self.all_data_cache = db.read_data(Config.CSV_FILES[view_type])
-            if view_type == "students":
-                programs = db.read_data("programs.csv")
-                program_lookup = {
-                    p["program_code"]: p["college_code"]
-                    for p in programs
-                }
-
-                for student in self.all_data_cache:
-                    student["college_code"] = program_lookup.get(
-                        student.get("program_code", ""),
-                        "N/A"
+            # Read on the I/O thread; the page is drawn when the data arrives
+            self._load_generation += 1
+            generation = self._load_generation
+            if preview and not self.sort_spec:
+                # First show a page of the table's first rows, which can be
+                # read without loading the rest of it
+                self.io.submit(
+                    lambda: self._fetch_view_preview(view_type),
+                    on_done=lambda data: self._show_preview(view_type, generation, data)
+                )
+            self.io.submit(
+                lambda: self._fetch_view_data(view_type),
+                on_done=lambda data: self._set_view_data(view_type, generation, *data)
             )
-            self.unfiltered_cache = self.all_data_cache[:]
-            self._apply_sort()
-            self.current_page = 1
+            return
 
         rpp = self.rows_per_page if self.rows_per_page > 0 else Config.DEFAULT_ROWS_PER_PAGE
         total_rows = len(self.all_data_cache)
@@ -420,35 +779,29 @@ class SSIS_APP:
         if self.current_page < 1:
             self.current_page = 1
 
-        start_idx = (self.current_page - 1) * rpp
+        if self.scroll_mode:
+            self.scroll_offset = max(0, min(self.scroll_offset, total_rows - rpp))
+            start_idx = self.scroll_offset
+        else:
+            start_idx = (self.current_page - 1) * rpp
         end_idx = start_idx + rpp
         page_data = self.all_data_cache[start_idx:end_idx]
 
         # Determine columns
         if self.all_data_cache:
-            cols = list(self.all_data_cache[0].keys())
+            cols = list(self.all_data_cache[0].keys()) + list(self.derived)
         else:
             cols = Config.DEFAULT_COLUMNS[view_type]
 
         self.configure_tree_columns(cols)
+        self.table.show(page_data)
 
-        # Clear existing rows
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        # Insert page data
-        for i, row in enumerate(page_data):
-            tag = ('evenrow',) if i % 2 != 0 else ()
-            # Wrap long text
-            wrapped_vals = []
-            for val in row.values():
-                text = str(val)
-                if len(text) > 35:
-                    text = "\n".join(textwrap.wrap(text, width=35))
-                wrapped_vals.append(text)
-
-            self.tree.insert("", "end", values=wrapped_vals + ["Edit", "Delete"],
-                             tags=tag)
+        if self.scroll_mode:
+            if total_rows:
+                self.v_scroll.set(start_idx / total_rows, min(end_idx, total_rows) / total_rows)
+            else:
+                self.v_scroll.set(0, 1)
+            self._schedule_prefetch(start_idx, rpp)
 
         # Update pagination bar
         self.pagination.update(
@@ -460,27 +813,119 @@ class SSIS_APP:
             rows_per_page=rpp
         )
 
+    @instrument.timed("gui._fetch_view_data", rows=lambda result, *args: len(result[0]))
+    def _fetch_view_data(self, view_type):
+        """Runs on the I/O thread."""
+        filename = Config.CSV_FILES[view_type]
+        table = db.load_table(filename)
+        # A copy of the storage's columns, so the view can be patched on the
+        # Tk thread while writes change the storage on this one
+        if table.headers:
+            view_table = table.store.copy()
+        else:
+            view_table = ColumnarTable(db.SCHEMA[filename]['columns'])
+        return self._view_data(view_type, view_table)
+
+    def _view_data(self, view_type, view_table):
+        """Runs on the I/O thread. Everything _set_view_data installs."""
+        derived = self._derived_columns(view_type)
+        # Building the search index and measuring every column are the
+        # expensive parts; do them here too.
+        return (view_table, SearchIndex(view_table.rows, derived), derived,
+                ColumnLengths.of_table(view_table, derived))
+
+    def _derived_columns(self, view_type):
+        """Runs on the I/O thread."""
+        derived = {}
+        if view_type == "students":
+            # college_code is looked up when a row is shown, sorted or
+            # searched rather than copied into every student
+            lookup = self._college_lookup()
+            derived["college_code"] = lambda row: lookup.get(row.get("program_code", ""), "N/A")
+        return derived
+
+    def _fetch_view_preview(self, view_type):
+        """Runs on the I/O thread. Like _fetch_view_data over the first
+        PREVIEW_ROWS rows, plus the table's total; None if the table has
+        to be loaded to get them."""
+        filename = Config.CSV_FILES[view_type]
+        peek = db.peek_table(filename, Config.PREVIEW_ROWS)
+        if peek is None:
+            return None
+        headers, rows, total = peek
+        view_table = ColumnarTable(headers or db.SCHEMA[filename]['columns'], rows)
+        return self._view_data(view_type, view_table), total
+
+    def _show_preview(self, view_type, generation, data):
+        # The preview is a complete, small view, so paging, sorting and
+        # searching it work until the full one replaces it
+        if data is None:
+            return
+        view_data, total = data
+        self._set_view_data(view_type, generation, *view_data)
+        if generation == self._load_generation and total > len(view_data[0]):
+            self.pagination.info_label.config(text=f"Loading {total:,} entries...")
+
+    def _college_lookup(self):
+        """Runs on the I/O thread. program_code -> college_code, rebuilt only
+        when programs.csv has changed since the last call."""
+        programs = db.load_table("programs.csv")
+        if self._college_join is None or self._college_join[0] != programs.signature:
+            lookup = {p["program_code"]: p["college_code"] for p in programs.rows}
+            self._college_join = (programs.signature, lookup)
+        return self._college_join[1]
+
+    def _set_view_data(self, view_type, generation, view_table, search_index, derived,
+                       column_lengths):
+        if generation != self._load_generation or view_type != self.current_view:
+            return
+        rows = view_table.rows
+        self.view_table = view_table
+        # The table's own row list is the unfiltered view; no second copy
+        self.unfiltered_cache = rows
+        self.derived = derived
+        self.search_index = search_index
+        self.search_session = SearchSession(search_index)
+        # Keep whatever is in the search box (possibly typed while the
+        # preview was up) applied to the new rows
+        query = self._search_query()
+        self.all_data_cache = self.search_session.search(query) if query else rows[:]
+        self.sort_cache = SortCache(self.unfiltered_cache, derived=derived)
+        self.table.reset(derived)
+        self.column_lengths = column_lengths
+        self._filtered_lengths.clear()
+        pk_col = Config.PK_COLUMN[view_type]
+        self.record_index = {db.normalize_key(row[pk_col]): row for row in rows}
+        self._apply_sort()
+        if generation != self._shown_generation:
+            # Only a new load starts over at the top; the full table keeps
+            # the page the user moved to in its preview
+            self.current_page = 1
+            self.scroll_offset = 0
+        self._shown_generation = generation
+        self.load_table_data(view_type, refresh_cache=False)
+
     def configure_tree_columns(self, cols):
         all_cols = cols + ["edit", "delete"]
-        self.tree.configure(columns=all_cols)
+        if list(self.tree["columns"]) != all_cols:
+            self.tree.configure(columns=all_cols)
         overflow_active = self.h_scroll.winfo_ismapped()
 
         # Calculate optimal widths for data columns
-        max_lengths = {col: len(col) for col in cols}
-        for row in self.all_data_cache:
-            for col in cols:
-                val_len = len(str(row.get(col, "")))
-                if val_len > max_lengths[col]:
-                    max_lengths[col] = val_len
+        longest = self._column_lengths()
+        max_lengths = {col: max(len(col), longest.get(col, 0)) for col in cols}
 
-        # Set data column headings with sort indicators
-        sort_col = self.current_sort_col
-        sort_rev = self.current_sort_reverse
+        # Set data column headings with sort indicators, numbered by
+        # priority when sorting on more than one column
+        sort_rank = {col: (i, rev) for i, (col, rev) in enumerate(self.sort_spec)}
 
         for col in cols:
             display = col.replace("_", " ").upper()
-            if col == sort_col:
-                display += "  ▼" if sort_rev else "  ▲"
+            if col in sort_rank:
+                i, rev = sort_rank[col]
+                display += "  ▼" if rev else "  ▲"
+                if len(self.sort_spec) > 1:
+                    display += str(i + 1)
             self.tree.heading(
                 col, text=display, anchor="w",
                 command=lambda c=col: self.sort_column(c)
@@ -499,6 +944,20 @@ class SSIS_APP:
         self.tree.heading("delete", text="", anchor="center")
         self.tree.column("delete", width=70, minwidth=70, anchor="center", stretch=False)
 
+    def _column_lengths(self):
+        """Longest value per column among the rows in all_data_cache."""
+        query = self._search_query()
+        if not query:
+            return self.column_lengths.longest()
+        if self._lengths_version != self.search_index.version:
+            self._filtered_lengths.clear()
+            self._lengths_version = self.search_index.version
+        lengths = self._filtered_lengths.get(query)
+        if lengths is None:
+            lengths = longest_values(self.view_table, self.all_data_cache, self.derived)
+            self._filtered_lengths[query] = lengths
+        return lengths
+
     def calculate_rows_per_page(self):
         self.root.update_idletasks()
         # Read the tree widget's own height — the scrollbar lives in a separate
@@ -582,22 +1041,12 @@ class SSIS_APP:
 
         self.root.minsize(Config.MIN_TOTAL_WIDTH, min_h)
 
+    @instrument.timed("gui._apply_sort", rows=_view_rows)
     def _apply_sort(self):
-        """Sort the current cache based on self.current_sort_col and self.current_sort_reverse."""
-        if not self.all_data_cache or not self.current_sort_col:
+        """Sort the current cache based on self.sort_spec."""
+        if not self.all_data_cache or not self.sort_spec:
             return
-        col = self.current_sort_col
-        reverse = self.current_sort_reverse
-        try:
-            self.all_data_cache.sort(
-                key=lambda x: float(str(x.get(col, 0)).replace("\n", "").strip()),
-                reverse=reverse
-            )
-        except ValueError:
-            self.all_data_cache.sort(
-                key=lambda x: str(x.get(col, "")).lower().replace("\n", "").strip(),
-                reverse=reverse
-            )
+        self.all_data_cache = self.sort_cache.sorted_rows(self.all_data_cache, self.sort_spec)
 
     # ------------------------------------------------------------------
     # Pagination Actions
@@ -616,18 +1065,85 @@ class SSIS_APP:
         self.current_page = page
         self.load_table_data(self.current_view, refresh_cache=False)
 
+    # ------------------------------------------------------------------
+    # Continuous Scrolling
+    # ------------------------------------------------------------------
+    def toggle_scroll_mode(self):
+        """Switch between pages and one continuous list, keeping the first
+        visible row in view."""
+        rpp = max(1, self.rows_per_page)
+        if self.scroll_mode:
+            self.current_page = self.scroll_offset // rpp + 1
+            self.v_scroll.grid_remove()
+        else:
+            self.scroll_offset = (self.current_page - 1) * rpp
+            self.v_scroll.grid()
+        self.scroll_mode = not self.scroll_mode
+        self.pagination.set_scroll_mode(self.scroll_mode)
+        self.load_table_data(self.current_view, refresh_cache=False)
+
+    def scroll_to(self, offset):
+        if not self.scroll_mode:
+            return
+        offset = max(0, min(int(offset), len(self.all_data_cache) - self.rows_per_page))
+        if offset != self.scroll_offset:
+            self.scroll_offset = offset
+            self.load_table_data(self.current_view, refresh_cache=False)
+
+    def on_vscroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.all_data_cache))
+        elif unit == "pages":
+            self.scroll_to(self.scroll_offset + int(amount) * self.rows_per_page)
+        else:
+            self.scroll_to(self.scroll_offset + int(amount))
+
+    def on_mousewheel(self, event):
+        if not self.scroll_mode:
+            return
+        if event.num == 4 or event.delta > 0:
+            step = -Config.SCROLL_WHEEL_ROWS
+        else:
+            step = Config.SCROLL_WHEEL_ROWS
+        self.scroll_to(self.scroll_offset + step)
+        return "break"
+
+    def _schedule_prefetch(self, start_idx, rpp):
+        if self._prefetch_after_id:
+            self.root.after_cancel(self._prefetch_after_id)
+        self._prefetch_after_id = self.root.after_idle(self._prefetch, start_idx, rpp)
+
+    def _prefetch(self, start_idx, rpp):
+        """Prepare display strings for the windows around the visible one
+        while the UI is idle, so the next scroll step only moves values."""
+        self._prefetch_after_id = None
+        span = rpp * Config.SCROLL_PREFETCH_WINDOWS
+        lo = max(0, start_idx - span)
+        for record in self.all_data_cache[lo:start_idx + rpp + span]:
+            self.table.display_values(record)
+
     # ------------------------------------------------------------------
     # Sorting
     # ------------------------------------------------------------------
+    def _note_sort_modifier(self, event):
+        # Heading commands get no event, so remember Shift from the press
+        self._sort_extend = bool(event.state & 0x0001)
+
     def sort_column(self, col):
+        """Click sorts by col alone; Shift+click adds col as a further sort
+        key. Clicking a column that is already sorted flips its direction."""
         if col == "actions" or not self.all_data_cache:
             return
 
-        if col == self.current_sort_col:
-            self.current_sort_reverse = not self.current_sort_reverse
+        current = dict(self.sort_spec)
+        reverse = not current[col] if col in current else False
+        if self._sort_extend:
+            if col in current:
+                self.sort_spec = [(c, reverse if c == col else r) for c, r in self.sort_spec]
+            else:
+                self.sort_spec.append((col, False))
         else:
-            self.current_sort_col = col
-            self.current_sort_reverse = False
+            self.sort_spec = [(col, reverse if len(current) == 1 else False)]
 
         self._apply_sort()
         self.load_table_data(self.current_view, refresh_cache=False)
@@ -645,19 +1161,22 @@ class SSIS_APP:
 
         if self._search_after_id:
             self.root.after_cancel(self._search_after_id)
-        self._search_after_id = self.root.after(300, self.filter_search)
+        self._search_after_id = self.root.after(Config.SEARCH_DEBOUNCE_MS, self.filter_search)
 
-    def filter_search(self):
+    def _search_query(self):
         query = self.search_entry.get().strip().lower()
-        if not query or query == self.placeholder_text.lower():
+        return "" if query == self.placeholder_text.lower() else query
+
+    @instrument.timed("gui.filter_search", rows=_view_rows)
+    def filter_search(self):
+        query = self._search_query()
+        if not query:
             self.all_data_cache = self.unfiltered_cache[:]
         else:
-            self.all_data_cache = [
-                row for row in self.unfiltered_cache
-                if query in " ".join(map(str, row.values())).lower()
-            ]
+            self.all_data_cache = self.search_session.search(query)
         self._apply_sort()
         self.current_page = 1
+        self.scroll_offset = 0
         self.load_table_data(self.current_view, refresh_cache=False)
 
     def clear_placeholder(self, event):
@@ -674,7 +1193,10 @@ class SSIS_APP:
         self.search_entry.delete(0, tk.END)
         self.clear_btn.pack_forget()
         self.root.focus_set()
-        self.load_table_data(self.current_view, refresh_cache=True)
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        self.filter_search()
 
     # ------------------------------------------------------------------
     # View Switching
@@ -690,7 +1212,7 @@ class SSIS_APP:
                 btn.config(fg=Config.FG_MUTED, bg=Config.BG_DARK)
 
         self.calculate_rows_per_page()
-        self.load_table_data(view_type)
+        self.load_table_data(view_type, preview=True)
 
     # ------------------------------------------------------------------
     # CRUD Operations
@@ -727,31 +1249,14 @@ class SSIS_APP:
                 font=(Config.FONT_FAMILY, Config.FONT_SIZE_SMALL, "bold")
             ).pack(anchor="w", pady=(0, 5))
 
-            if field == "Program Code" and self.current_view == "students":
-                codes = sorted(
-                    row["program_code"]
-                    for row in db.read_data("programs.csv")
-                )
-
+            if ((field == "Program Code" and self.current_view == "students")
+                    or (field == "College Code" and self.current_view == "programs")):
                 entry = ttk.Combobox(
                     frame,
-                    values=codes,
-                    state="readonly",
-                    height=10
-                )
-
-            elif field == "College Code" and self.current_view == "programs":
-                codes = sorted(
-                    row["college_code"]
-                    for row in db.read_data("colleges.csv")
-                )
-
-                entry = ttk.Combobox(
-                    frame,
-                    values=codes,
                     state="readonly",
                     height=10
                 )
+                self._fill_code_choices(entry, Config.FIELD_TO_COLUMN[self.current_view][field])
 
             elif field in ["Gender", "Year Level"]:
                 values = Config.GENDER_OPTIONS if field == "Gender" else Config.YEAR_OPTIONS
@@ -799,94 +1304,51 @@ class SSIS_APP:
             padx=25, pady=8, command=lambda: self.submit_data(edit_id), cursor="hand2"
         ).pack(side="right")
 
-    def submit_data(self, edit_target_id=None):
-        try:
-            raw_data = {field: widget.get().strip() for field, widget in self.inputs.items()}
+    def _fill_code_choices(self, combobox, column):
+        parent_file = Config.CSV_FILES["programs" if column == "program_code" else "colleges"]
 
-            if any(val == "" for val in raw_data.values()):
-                messagebox.showwarning("Input Error", "All fields are required.")
-                return
+        def apply(codes):
+            if combobox.winfo_exists():
+                combobox.configure(values=codes)
 
-            mapping = Config.FIELD_TO_COLUMN[self.current_view]
-            final_dict = {mapping[k]: v for k, v in raw_data.items()}
-            filename = Config.CSV_FILES[self.current_view]
-
-            if edit_target_id:
-                # ----------------------------------------------------------
-                # EDIT MODE — validate first, then write
-                # ----------------------------------------------------------
-                old_pk = edit_target_id
-                new_pk = list(final_dict.values())[0]
-                pk_col = Config.PK_COLUMN[self.current_view]
-
-                # If PK changed, ensure the new one isn't already taken
-                if old_pk != new_pk:
-                    if not db.is_unique_excluding(filename, pk_col, new_pk, old_pk):
-                        messagebox.showerror("Validation Error",
-                            f"{pk_col.replace('_', ' ').title()} '{new_pk}' already exists.")
-                        return
-
-                # Validate FK relationships before touching the file
-                if self.current_view == "programs":
-                    college_code = final_dict.get("college_code")
-                    if not db.parent_exists("colleges.csv", "college_code", college_code):
-                        messagebox.showerror("Validation Error",
-                            f"College '{college_code}' does not exist.")
-                        return
-
-                elif self.current_view == "students":
-                    import re
-                    sid = final_dict.get("student_id", "")
-                    if not re.match(r"^\d{4}-\d{4}$", sid):
-                        messagebox.showerror("Validation Error",
-                            "Student ID must be in YYYY-NNNN format.")
-                        return
-                    if final_dict.get("gender") not in db.GENDER_OPTIONS:
-                        messagebox.showerror("Validation Error", "Gender must be M, F, or O.")
-                        return
-                    prog = final_dict.get("program_code")
-                    if not db.parent_exists("programs.csv", "program_code", prog):
-                        messagebox.showerror("Validation Error",
-                            f"Program '{prog}' does not exist.")
-                        return
-
-                # All checks passed — write to disk
-                if self.current_view == "colleges":
-                    db.update_college_cascade(old_pk, final_dict)
-                elif self.current_view == "programs":
-                    db.update_program_cascade(old_pk, final_dict)
-                else:
-                    db.update_row(filename, old_pk, final_dict)
+        self.io.submit(
+            lambda: sorted(row[column] for row in db.read_data(parent_file)),
+            on_done=apply
+        )
 
-            else:
-                # ----------------------------------------------------------
-                # ADD MODE — validate first, then append
-                # ----------------------------------------------------------
-                if self.current_view == "colleges":
-                    success, msg = db.validate_college(final_dict["college_code"])
-                elif self.current_view == "programs":
-                    success, msg = db.validate_program(
-                        final_dict["program_code"], final_dict["college_code"])
-                else:
-                    success, msg = db.validate_student(
-                        final_dict["student_id"], final_dict["gender"], final_dict["program_code"])
+    @instrument.timed("gui.submit_data")
+    def submit_data(self, edit_target_id=None):
+        raw_data = {field: widget.get().strip() for field, widget in self.inputs.items()}
 
-                if not success:
-                    messagebox.showerror("Validation Error", msg)
-                    return
+        if any(val == "" for val in raw_data.values()):
+            messagebox.showwarning("Input Error", "All fields are required.")
+            return
 
-                db.append_row(filename, list(final_dict.keys()), final_dict)
+        view = self.current_view
+        mapping = Config.FIELD_TO_COLUMN[view]
+        final_dict = {mapping[k]: v for k, v in raw_data.items()}
+        form_window = self.form_window
 
-            # Shared success path
+        def on_done(result):
+            error, record = result
+            if error:
+                messagebox.showerror("Validation Error", error)
+                return
             messagebox.showinfo("Success",
-                f"{self.current_view[:-1].capitalize()} saved successfully.")
-            self.form_window.destroy()
-            self.load_table_data(self.current_view, refresh_cache=True)
+                f"{view[:-1].capitalize()} saved successfully.")
+            if form_window.winfo_exists():
+                form_window.destroy()
+            if view == self.current_view:
+                self._patch_record(edit_target_id, record)
 
-        except Exception as e:
-            messagebox.showerror("Unexpected Error", f"An error occurred:\n{str(e)}")
-            import traceback
-            traceback.print_exc()
+        self.io.submit(lambda: self._save_record(view, final_dict, edit_target_id),
+                       on_done=on_done)
+
+    @instrument.timed("gui._save_record")
+    def _save_record(self, view, final_dict, edit_target_id=None):
+        """Validate and write one record. Runs on the I/O thread; returns
+        (validation message, None) or (None, the record as saved)."""
+        return db.save_record(Config.CSV_FILES[view], final_dict, edit_target_id or None)
 
     def handle_table_click(self, event):
         item = self.tree.identify_row(event.y)
@@ -896,50 +1358,103 @@ class SSIS_APP:
 
         cols = self.tree["columns"]
         col_index = int(column.replace("#", "")) - 1
-        row_vals = self.tree.item(item, "values")
         data_cols_count = len(cols) - 2
+        # The raw record, not the wrapped display values
+        raw_record = self.table.record(item)
+        if raw_record is None:
+            return
+        pk = str(raw_record[Config.PK_COLUMN[self.current_view]]).strip()
 
         if col_index == data_cols_count:
-            # Look up raw record from cache by PK to avoid wrapped display values
-            pk = str(row_vals[0]).strip()
-            pk_col = Config.PK_COLUMN[self.current_view]
-            raw_record = next(
-                (r for r in self.all_data_cache
-                 if str(r.get(pk_col, "")).strip() == pk),
-                None
+            self.open_add_form(
+                edit_mode=True,
+                item_id=pk,
+                current_vals=list(raw_record.values())
             )
-            if raw_record:
-                self.open_add_form(
-                    edit_mode=True,
-                    item_id=pk,
-                    current_vals=list(raw_record.values())
-                )
         elif col_index == data_cols_count + 1:
-            self.confirm_single_delete(item, row_vals[0])
+            self.confirm_single_delete(item, pk)
 
     def confirm_single_delete(self, item, pk):
         pk = str(pk).strip()
         if not messagebox.askyesno("Confirm Delete", f"Delete record '{pk}'?"):
             return
 
-        if self.current_view == "colleges":
-            db.delete_college_cascade(pk)
-        elif self.current_view == "programs":
-            db.delete_program_cascade(pk)
+        view = self.current_view
+
+        def delete():
+            if view == "colleges":
+                db.delete_college_cascade(pk)
+            elif view == "programs":
+                db.delete_program_cascade(pk)
+            else:
+                db.delete_record(
+                    Config.CSV_FILES[view],
+                    Config.PK_COLUMN[view],
+                    pk
+                )
+
+        def on_done(_):
+            if view == self.current_view:
+                self._patch_record(pk, None)
+
+        self.io.submit(delete, on_done=on_done)
+
+    @instrument.timed("gui._patch_record")
+    def _patch_record(self, old_pk, record):
+        """Apply one saved or deleted record to the in-memory view instead
+        of reloading it. old_pk is None for a new record and record is None
+        for a deletion. Each cache is patched with a binary search, so the
+        cost does not grow with the table beyond list inserts."""
+        old = None
+        if old_pk is not None:
+            old = self.record_index.pop(db.normalize_key(old_pk), None)
+            if old is None:
+                # Not in the loaded data (it changed underneath us); reload.
+                self.load_table_data(self.current_view, refresh_cache=True)
+                return
+            # Take the record out of the displayed list while the sort
+            # cache still holds its old keys
+            i = self.sort_cache.locate(self.all_data_cache, old, self.sort_spec)
+            if i < len(self.all_data_cache) and self.all_data_cache[i] is old:
+                del self.all_data_cache[i]
+            self.table.forget(old)
+            self.column_lengths.remove(old)
+
+        if record is None:
+            if old is not None:
+                del self.unfiltered_cache[self.sort_cache.locate(self.unfiltered_cache, old, ())]
+                self.sort_cache.remove(old)
+                self.search_index.remove(old)
         else:
-            db.delete_record(
-                Config.CSV_FILES[self.current_view],
-                Config.PK_COLUMN[self.current_view],
-                pk
-            )
+            if old is None:
+                # Also lands at the end of unfiltered_cache (view_table.rows)
+                record = self.view_table.append(record)
+                self.sort_cache.add(record)
+                self.search_index.add(record)
+            else:
+                old.update(record)
+                record = old
+                self.sort_cache.update(record)
+                self.search_index.update(record)
+            self.column_lengths.add(record)
+            pk_col = Config.PK_COLUMN[self.current_view]
+            self.record_index[db.normalize_key(record[pk_col])] = record
+            query = self._search_query()
+            if not query or self.search_index.matches(record, query):
+                i = self.sort_cache.locate(self.all_data_cache, record, self.sort_spec)
+                self.all_data_cache.insert(i, record)
 
-        self.load_table_data(self.current_view, refresh_cache=True)
+        self.load_table_data(self.current_view, refresh_cache=False)
 
     # ------------------------------------------------------------------
     # Import CSV
     # ------------------------------------------------------------------
+    # Includes the time the file and mode dialogs are open; the import
+    # itself shows up as importer.import_file
+    @instrument.timed("gui.import_csv")
     def import_csv(self):
-        required_headers = Config.DEFAULT_COLUMNS[self.current_view]
+        filename = Config.CSV_FILES[self.current_view]
+        required_headers = db.SCHEMA[filename]['columns']
         file_path = filedialog.askopenfilename(
             title=f"Import {self.current_view.capitalize()} CSV",
             filetypes=[("CSV files", "*.csv")]
@@ -948,37 +1463,141 @@ class SSIS_APP:
             return
 
         try:
-            with open(file_path, mode="r", newline='', encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                file_headers = reader.fieldnames
-
-                if not file_headers:
-                    messagebox.showerror("Error", "The selected file is empty or invalid.")
-                    return
-
-                missing = [h for h in required_headers if h not in file_headers]
-                extra = [h for h in file_headers if h not in required_headers]
-
-                if missing:
-                    error_msg = f"Validation Failed!\n\nMissing Columns: {', '.join(missing)}"
-                    if extra:
-                        error_msg += f"\n\nUnknown columns found: {', '.join(extra)}"
-                    error_msg += f"\n\nPlease ensure your CSV headers match: {', '.join(required_headers)}"
-                    messagebox.showerror("Header Mismatch", error_msg)
-                    return
-
-                new_records = list(reader)
-                if not new_records:
-                    messagebox.showwarning("Warning", "No data found in the CSV file.")
-                    return
-
-                if messagebox.askyesno("Confirm Import", f"Import {len(new_records)} records into {self.current_view}?"):
-                    filename = Config.CSV_FILES[self.current_view]
-                    db.save_data(filename, required_headers, new_records)
-                    self.load_table_data(self.current_view, refresh_cache=True)
-                    messagebox.showinfo("Success", f"Successfully imported {len(new_records)} records.")
+            file_headers = importer.read_headers(file_path)
+
+            if not file_headers:
+                messagebox.showerror("Error", "The selected file is empty or invalid.")
+                return
+
+            missing = [h for h in required_headers if h not in file_headers]
+            extra = [h for h in file_headers if h not in required_headers]
+
+            if missing:
+                error_msg = f"Validation Failed!\n\nMissing Columns: {', '.join(missing)}"
+                if extra:
+                    error_msg += f"\n\nUnknown columns found: {', '.join(extra)}"
+                error_msg += f"\n\nPlease ensure your CSV headers match: {', '.join(required_headers)}"
+                messagebox.showerror("Header Mismatch", error_msg)
+                return
+
+            mode = self.ask_import_mode()
+            if not mode:
+                return
         except Exception as e:
             messagebox.showerror("Import Error", f"An error occurred: {str(e)}")
+            return
+
+        # First pass only validates, so the user sees the report before
+        # anything is written. Both passes stream the file in chunks on the
+        # I/O thread.
+        view = self.current_view
+        self.io.submit(
+            lambda: importer.import_file(filename, file_path, mode, dry_run=True,
+                                         on_progress=self._post_import_progress),
+            on_done=lambda preview: self._confirm_import(view, file_path, mode, preview),
+            on_error=self._import_failed
+        )
+
+    def _confirm_import(self, view, file_path, mode, preview):
+        self.pagination.info_label.config(text="")
+        if not preview.accepted and not preview.skipped and not preview.errors:
+            messagebox.showwarning("Warning", "No data found in the CSV file.")
+            return
+
+        if not preview.accepted and not preview.errors and mode == "replace":
+            # Replacing with nothing would delete every record in the view
+            messagebox.showerror("Nothing to Import",
+                f"None of the rows can be imported, so {view} was left unchanged.")
+            return
+
+        summary = (f"{preview.inserted} new, {preview.updated} updated, "
+                   f"{preview.skipped} skipped")
+        if preview.errors:
+            errors = preview.errors
+            report = "\n".join(f"Line {line}: {msg}" for line, msg in errors[:Config.IMPORT_ERRORS_SHOWN])
+            if len(errors) > Config.IMPORT_ERRORS_SHOWN:
+                report += f"\n...and {len(errors) - Config.IMPORT_ERRORS_SHOWN} more."
+            if not preview.accepted:
+                messagebox.showerror("Validation Failed",
+                    f"None of the rows can be imported:\n\n{report}")
+                return
+            if not messagebox.askyesno("Validation Problems",
+                    f"{len(errors)} rows were rejected:\n\n{report}\n\n"
+                    f"Import the valid rows anyway? ({summary})"):
+                return
+        elif not messagebox.askyesno("Confirm Import",
+                f"Import into {view} ({importer.MODES[mode].lower()})?\n\n{summary}"):
+            return
+
+        def on_done(result):
+            self.load_table_data(self.current_view, refresh_cache=True)
+            messagebox.showinfo("Success",
+                f"Import finished: {result.inserted} added, {result.updated} updated, "
+                f"{result.skipped} skipped.")
+
+        self.io.submit(
+            lambda: importer.import_file(Config.CSV_FILES[view], file_path, mode,
+                                         on_progress=self._post_import_progress),
+            on_done=on_done,
+            on_error=self._import_failed
+        )
+
+    def _import_failed(self, error):
+        self.pagination.info_label.config(text="")
+        messagebox.showerror("Import Error", f"An error occurred: {str(error)}")
+        self.load_table_data(self.current_view, refresh_cache=True)
+
+    def _post_import_progress(self, fraction):
+        # Called on the I/O thread
+        self.io.post(self._show_import_progress, fraction)
+
+    def _show_import_progress(self, fraction):
+        self.pagination.info_label.config(text=f"Importing... {int(fraction * 100)}%")
+
+    def ask_import_mode(self):
+        """Modal picker for importer.MODES; returns the chosen mode or None."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Import Mode")
+        dialog.configure(bg=Config.BG_DARK)
+        dialog.resizable(False, False)
+        dialog.grab_set()
+
+        tk.Label(
+            dialog, text="How should the file be imported?", fg=Config.FG_LIGHT,
+            bg=Config.BG_DARK, font=(Config.FONT_FAMILY, Config.FONT_SIZE_LARGE, "bold")
+        ).pack(anchor="w", padx=30, pady=(25, 10))
+
+        choice = tk.StringVar(value="upsert")
+        for mode, label in importer.MODES.items():
+            tk.Radiobutton(
+                dialog, text=label, value=mode, variable=choice,
+                bg=Config.BG_DARK, fg=Config.FG_LIGHT, selectcolor=Config.BG_INPUT,
+                activebackground=Config.BG_DARK, activeforeground=Config.ACCENT,
+                font=(Config.FONT_FAMILY, Config.FONT_SIZE_NORMAL), anchor="w"
+            ).pack(fill="x", padx=30, pady=2)
+
+        result = {"mode": None}
+
+        def confirm():
+            result["mode"] = choice.get()
+            dialog.destroy()
+
+        footer = tk.Frame(dialog, bg=Config.BG_DARK)
+        footer.pack(fill="x", padx=30, pady=25)
+        tk.Button(
+            footer, text="Cancel", bg=Config.BG_DARK, fg=Config.FG_MUTED,
+            relief="flat", font=(Config.FONT_FAMILY, Config.FONT_SIZE_NORMAL, "bold"),
+            command=dialog.destroy, cursor="hand2"
+        ).pack(side="left")
+        tk.Button(
+            footer, text="Continue", bg=Config.ACCENT, fg=Config.FG_LIGHT,
+            relief="flat", font=(Config.FONT_FAMILY, Config.FONT_SIZE_NORMAL, "bold"),
+            padx=25, pady=8, command=confirm, cursor="hand2"
+        ).pack(side="right")
+        dialog.bind("<Escape>", lambda e: dialog.destroy())
+
+        self.root.wait_window(dialog)
+        return result["mode"]
 
     # ------------------------------------------------------------------
     # Hover Effects 
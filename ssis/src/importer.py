@@ -0,0 +1,179 @@
+"""Bulk import of CSV files into the SSIS tables."""
+import csv
+import os
+from contextlib import nullcontext
+
+import database as db
+import instrument
+
+
+class RowValidator:
+    """Checks import rows one at a time against in-memory key sets.
+
+    Parent keys are loaded once up front and keys seen earlier in the same
+    import are remembered, so a whole file is validated in a single pass
+    instead of calling validate_* (and re-reading tables) per row."""
+
+    def __init__(self, filename):
+        spec = db.SCHEMA[filename]
+        self.filename = filename
+        self.pk = spec['pk']
+        self.columns = spec['columns']
+        self.seen = set()
+        self.fk_col = None
+        self.parent_keys = None
+        if spec['parent']:
+            self.fk_col, parent_file = spec['parent']
+            parent_pk = db.SCHEMA[parent_file]['pk']
+            self.parent_keys = set(db.load_table(parent_file).index(parent_pk))
+
+    def check(self, row):
+        """Return an error message for row, or None if it can be imported."""
+        missing = [col for col in self.columns if not str(row.get(col) or '').strip()]
+        if missing:
+            return f"Missing {', '.join(missing)}."
+
+        pk_value = row[self.pk].strip()
+        if self.filename == 'students.csv':
+            if not db.is_valid_student_id(pk_value):
+                return f"Student ID '{pk_value}' is not in YYYY-NNNN format."
+            if row['gender'].strip() not in db.GENDER_OPTIONS:
+                return f"Gender '{row['gender']}' must be M, F, or O."
+
+        key = db.normalize_key(pk_value)
+        if key in self.seen:
+            return f"Duplicate {self.pk.replace('_', ' ')} '{pk_value}'."
+
+        if self.fk_col:
+            parent = row[self.fk_col].strip()
+            if parent != db.MISSING_PARENT and db.normalize_key(parent) not in self.parent_keys:
+                return f"{self.fk_col.replace('_', ' ').capitalize()} '{parent}' does not exist."
+
+        self.seen.add(key)
+        return None
+
+
+# ----------------------------------------------------------------------
+# Streaming import
+# ----------------------------------------------------------------------
+MODES = {
+    "upsert": "Add new records and update existing ones",
+    "skip-existing": "Add new records, leave existing ones untouched",
+    "append": "Add new records, reject IDs that already exist",
+    "replace": "Replace all existing records"
+}
+CHUNK_SIZE = 5000
+
+
+class ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = []
+
+    @property
+    def accepted(self):
+        return self.inserted + self.updated
+
+
+def read_headers(file_path):
+    with open(file_path, mode='r', newline='', encoding='utf-8') as f:
+        return csv.DictReader(f, skipinitialspace=True).fieldnames
+
+
+def _read_chunks(source, chunk_size, on_progress):
+    """Yield lists of up to chunk_size rows, reporting the fraction of the
+    file consumed so far. Only one chunk is held in memory at a time.
+    source is a path or an open text file; progress needs a path."""
+    if isinstance(source, (str, os.PathLike)):
+        total = os.path.getsize(source) or 1
+        opened = open(source, mode='r', newline='', encoding='utf-8')
+    else:
+        total = None
+        opened = nullcontext(source)
+    consumed = counted = 0
+    with opened as f:
+        def lines():
+            nonlocal consumed
+            for line in f:
+                consumed += len(line)
+                yield line
+
+        chunk = []
+        for row in csv.DictReader(lines(), skipinitialspace=True):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                instrument.count(rows=len(chunk), read=consumed - counted)
+                counted = consumed
+                yield chunk
+                chunk = []
+                if on_progress and total:
+                    on_progress(min(consumed / total, 1.0))
+        if chunk:
+            instrument.count(rows=len(chunk), read=consumed - counted)
+            yield chunk
+    if on_progress:
+        on_progress(1.0)
+
+
+@instrument.timed("importer.import_file")
+def import_file(filename, file_path, mode="upsert", dry_run=False,
+                on_progress=None, chunk_size=CHUNK_SIZE):
+    """Stream file_path into the table behind filename.
+
+    mode is one of MODES. With dry_run the file is only validated and the
+    returned ImportResult says what an actual run would do. file_path may
+    also be an open text file, such as stdin."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown import mode '{mode}'.")
+    validator = RowValidator(filename)
+    columns = db.SCHEMA[filename]['columns']
+    pk = db.SCHEMA[filename]['pk']
+    existing = {} if mode == "replace" else db.load_table(filename).index(pk)
+    result = ImportResult()
+
+    def valid_rows(chunk, first_line):
+        for line, row in enumerate(chunk, start=first_line):
+            message = validator.check(row)
+            if message:
+                result.errors.append((line, message))
+            else:
+                yield line, {col: (row.get(col) or '').strip() for col in columns}
+
+    chunks = _read_chunks(file_path, chunk_size, on_progress)
+    with db.transaction():
+        if mode == "replace":
+            def all_rows():
+                line = 2
+                for chunk in chunks:
+                    for _, row in valid_rows(chunk, line):
+                        result.inserted += 1
+                        yield row
+                    line += len(chunk)
+            if dry_run:
+                for _ in all_rows():
+                    pass
+            else:
+                db.save_data(filename, columns, all_rows())
+            return result
+
+        line = 2
+        for chunk in chunks:
+            inserts, updates = [], []
+            for row_line, row in valid_rows(chunk, line):
+                matches = existing.get(db.normalize_key(row[pk]))
+                if not matches:
+                    inserts.append(row)
+                elif mode == "upsert":
+                    updates.append((next(iter(matches.values()))[pk], row))
+                elif mode == "skip-existing":
+                    result.skipped += 1
+                else:
+                    result.errors.append((row_line, f"{pk.replace('_', ' ').title()} '{row[pk]}' already exists."))
+            line += len(chunk)
+            result.inserted += len(inserts)
+            result.updated += len(updates)
+            if not dry_run and (inserts or updates):
+                db.apply_batch(filename, inserts, updates)
+    return result
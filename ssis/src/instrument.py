@@ -0,0 +1,159 @@
+"""Opt-in timing of the storage entry points and GUI handlers.
+
+Start the app with SSIS_PROFILE=1 to turn it on. Every instrumented call
+records its count, wall time, rows touched and bytes read/written; the
+totals are shown by the stats panel (F12 in the GUI) and appended to
+LOG_FILE, together with every call slower than SLOW_CALL_SECONDS. When it
+is off, timed() returns functions unchanged and count() does nothing.
+
+Bytes and rows read from or written to disk are counted where the I/O
+happens (see count) and charged to every instrumented call running on
+that thread, so like the times they include nested calls. GUI handlers
+touch no disk; their rows are the records of the view they worked on.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+ENABLED = os.environ.get('SSIS_PROFILE', '') not in ('', '0')
+
+LOG_FILE = os.environ.get(
+    'SSIS_PROFILE_LOG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'profile.log'))
+LOG_MAX_BYTES = 1024 * 1024     # rolled over into profile.log.1 .. .3
+LOG_BACKUPS = 3
+SLOW_CALL_SECONDS = 0.1
+
+
+class CallStats:
+    __slots__ = ('calls', 'errors', 'seconds', 'max_seconds', 'rows', 'bytes_read', 'bytes_written')
+
+    def __init__(self):
+        for field in self.__slots__:
+            setattr(self, field, 0)
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+_stats = {}                 # name -> CallStats
+_logged = {}                # name -> as_dict() at the last log_snapshot
+_lock = threading.Lock()
+_local = threading.local()
+_logger = None
+
+
+def _frames():
+    """[rows, bytes read, bytes written] of the calls running on this thread."""
+    frames = getattr(_local, 'frames', None)
+    if frames is None:
+        frames = _local.frames = []
+    return frames
+
+
+def count(rows=0, read=0, written=0):
+    """Charge disk I/O to the instrumented calls running on this thread."""
+    if not ENABLED:
+        return
+    for frame in _frames():
+        frame[0] += rows
+        frame[1] += read
+        frame[2] += written
+
+
+def timed(name, rows=None):
+    """Decorator recording calls to the function under name. rows, if
+    given, is called as rows(result, *args, **kwargs) and returns the
+    number of rows the call worked on."""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            frames = _frames()
+            frame = [0, 0, 0]
+            frames.append(frame)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+            finally:
+                elapsed = time.perf_counter() - start
+                frames.pop()
+                if not failed and rows is not None:
+                    frame[0] += rows(result, *args, **kwargs)
+                _record(name, elapsed, frame, failed)
+            return result
+        return wrapper
+    return decorate
+
+
+def _record(name, elapsed, frame, failed):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = CallStats()
+        stats.calls += 1
+        stats.errors += failed
+        stats.seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        stats.rows += frame[0]
+        stats.bytes_read += frame[1]
+        stats.bytes_written += frame[2]
+    if elapsed >= SLOW_CALL_SECONDS:
+        _log({"slow": name, "seconds": round(elapsed, 4), "rows": frame[0],
+              "bytes_read": frame[1], "bytes_written": frame[2], "failed": failed})
+
+
+def snapshot():
+    """name -> totals so far, as plain dicts."""
+    with _lock:
+        return {name: stats.as_dict() for name, stats in _stats.items()}
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _logged.clear()
+
+
+# ----------------------------------------------------------------------
+# Rolling log
+# ----------------------------------------------------------------------
+def _log(record):
+    global _logger
+    if _logger is None:
+        os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+        handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES,
+                                      backupCount=LOG_BACKUPS, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        _logger = logging.getLogger('ssis.profile')
+        _logger.propagate = False
+        _logger.setLevel(logging.INFO)
+        _logger.addHandler(handler)
+    _logger.info(json.dumps(record))
+
+
+def log_snapshot():
+    """Append what every call did since the last snapshot to the log."""
+    if not ENABLED:
+        return
+    current = snapshot()
+    changes = {}
+    with _lock:
+        for name, totals in current.items():
+            before = _logged.get(name)
+            if before is None or totals['calls'] != before['calls']:
+                changes[name] = {
+                    field: value if field == 'max_seconds' else value - (before or {}).get(field, 0)
+                    for field, value in totals.items()
+                }
+                _logged[name] = totals
+    if changes:
+        _log({"interval": changes})
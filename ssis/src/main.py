@@ -1,10 +1,22 @@
-import tkinter as tk
-from gui import SSIS_APP
+import locale
+import sys
 
 def main():
+    # Sort text columns by the user's collation rules
+    try:
+        locale.setlocale(locale.LC_COLLATE, "")
+    except locale.Error:
+        pass
+    if len(sys.argv) > 1:
+        # Subcommands run headless (see cli.py); Tk is never loaded
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
+
+    import tkinter as tk
+    from gui import SSIS_APP
     root = tk.Tk()
     SSIS_APP(root)
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
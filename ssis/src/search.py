@@ -0,0 +1,363 @@
+"""In-memory search over the rows shown in the table.
+
+Besides plain substring search, queries may contain column filters:
+
+    year_level:3-4 gender:F program_code:BSCS name:gar*
+
+A filter is ``field:value`` where value is an exact match, a ``*``
+wildcard pattern, a comma separated list of alternatives, or a range
+(``lo..hi``, or ``lo-hi`` on numeric columns). Filters are ANDed together
+and with any remaining free text.
+"""
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+
+# Filter names that cover more than one column
+FIELD_ALIASES = {
+    "name": ("first_name", "last_name"),
+    "id": ("student_id",),
+    "year": ("year_level",),
+    "program": ("program_code",),
+    "college": ("college_code",),
+}
+
+
+def row_text(row, derived=None):
+    """The lowercased string a row is matched against."""
+    values = list(map(str, row.values()))
+    if derived:
+        values.extend(str(func(row)) for func in derived.values())
+    return " ".join(values).lower()
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _as_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_query(query, columns):
+    """Split query into ([(columns, value), ...], free_text).
+
+    Tokens that look like filters but name an unknown field are kept as
+    free text, so searching for a literal "a:b" still works."""
+    filters, free = [], []
+    for token in query.lower().split():
+        field, sep, value = token.partition(":")
+        targets = FIELD_ALIASES.get(field, (field,))
+        targets = tuple(col for col in targets if col in columns)
+        if sep and value and targets:
+            filters.append((targets, value))
+        else:
+            free.append(token)
+    return filters, " ".join(free)
+
+
+class ColumnIndex:
+    """Value -> rows map for one column, plus its distinct values in sorted
+    order (and numerically, when every value is a number) so wildcard and
+    range filters are answered with bisect over the distinct values. Kept
+    current by add and remove as rows change."""
+
+    def __init__(self, column, entries, derived=None):
+        self.column = column
+        self.func = (derived or {}).get(column)
+        self.by_value = {}
+        self._value_of = {}     # key -> value, to unindex rows edited in place
+        for key, row in entries:
+            value = self._value(row)
+            self._value_of[key] = value
+            self.by_value.setdefault(value, set()).add(key)
+        self.values = sorted(self.by_value)
+        self._numbers = []      # sorted (number, value) for numeric values
+        self._non_numeric = 0   # distinct non-empty values that are not numbers
+        for value in self.values:
+            number = _as_number(value) if value else None
+            if number is not None:
+                self._numbers.append((number, value))
+            elif value:
+                self._non_numeric += 1
+        self._numbers.sort()
+
+    def _value(self, row):
+        value = self.func(row) if self.func else row.get(self.column, "")
+        return str(value).strip().lower()
+
+    @property
+    def numeric(self):
+        if self._numbers and not self._non_numeric:
+            return self._numbers
+        return None
+
+    def add(self, key, row):
+        value = self._value(row)
+        self._value_of[key] = value
+        keys = self.by_value.get(value)
+        if keys is None:
+            keys = self.by_value[value] = set()
+            insort(self.values, value)
+            number = _as_number(value) if value else None
+            if number is not None:
+                insort(self._numbers, (number, value))
+            elif value:
+                self._non_numeric += 1
+        keys.add(key)
+
+    def remove(self, key):
+        value = self._value_of.pop(key, None)
+        keys = self.by_value.get(value)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self.by_value[value]
+            del self.values[bisect_left(self.values, value)]
+            number = _as_number(value) if value else None
+            if number is not None:
+                del self._numbers[bisect_left(self._numbers, (number, value))]
+            elif value:
+                self._non_numeric -= 1
+
+    def accepts(self, row, value):
+        """Whether row alone matches value, reading ranges the way this
+        index does."""
+        single = ColumnIndex(self.column, [(id(row), row)],
+                             {self.column: self.func} if self.func else None)
+        single._non_numeric = self._non_numeric
+        return bool(single.match(value))
+
+    def _union(self, values):
+        keys = set()
+        for value in values:
+            keys |= self.by_value[value]
+        return keys
+
+    def match(self, value):
+        if "," in value:
+            keys = set()
+            for part in value.split(","):
+                if part:
+                    keys |= self.match(part)
+            return keys
+
+        if ".." in value or (self.numeric and "-" in value[1:]):
+            sep = ".." if ".." in value else "-"
+            lo, _, hi = value.partition(sep)
+            return self._range(lo, hi)
+
+        if "*" in value or "?" in value:
+            prefix = value.split("*", 1)[0].split("?", 1)[0]
+            start = bisect_left(self.values, prefix)
+            matched = []
+            for candidate in self.values[start:]:
+                if not candidate.startswith(prefix):
+                    break
+                if fnmatchcase(candidate, value):
+                    matched.append(candidate)
+            return self._union(matched)
+
+        return set(self.by_value.get(value, ()))
+
+    def _range(self, lo, hi):
+        if self.numeric:
+            lo_n = _as_number(lo) if lo else float("-inf")
+            hi_n = _as_number(hi) if hi else float("inf")
+            if lo_n is not None and hi_n is not None:
+                start = bisect_left(self.numeric, (lo_n, ""))
+                end = bisect_right(self.numeric, (hi_n, "\uffff"))
+                return self._union(v for _, v in self.numeric[start:end])
+        start = bisect_left(self.values, lo) if lo else 0
+        end = bisect_right(self.values, hi) if hi else len(self.values)
+        return self._union(self.values[start:end])
+
+
+class SearchIndex:
+    """Substring search with precomputed haystacks and a trigram index.
+
+    Each row's lowercased text is built once. Queries of three or more
+    characters only look at rows that contain the query's rarest trigram;
+    shorter ones fall back to scanning the precomputed strings. Rows are
+    tracked by identity and can be added, updated or removed one at a time.
+    Column indexes for filters are built on first use and kept current as
+    rows change.
+
+    Rows are numbered in the order they were added, and the trigram index
+    maps each trigram to an array of those numbers rather than a set of
+    rows, a few bytes per entry. Entries of removed rows, and of trigrams
+    an updated row no longer has, are left in place; every candidate is
+    checked against the row's current text anyway.
+
+    derived maps extra column names to functions computing them from a
+    row; they are searched like stored columns.
+    """
+
+    def __init__(self, rows=(), derived=None):
+        self.version = 0        # bumped on every change, see SearchSession
+        self.derived = derived or {}
+        self.columns = set(self.derived)
+        self._keys = {}         # id(row) -> number
+        self._rows = []         # number -> row, None once removed
+        self._texts = []        # number -> text, None once removed
+        self._postings = {}     # trigram -> array of numbers
+        self._columns = {}      # column -> ColumnIndex
+        for row in rows:
+            self.add(row)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def text(self, row):
+        return self._texts[self._keys[id(row)]]
+
+    def _post(self, key, grams):
+        postings = self._postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('I')
+            posting.append(key)
+
+    def add(self, row):
+        self.version += 1
+        self.columns.update(row)
+        text = row_text(row, self.derived)
+        key = self._keys[id(row)] = len(self._rows)
+        for index in self._columns.values():
+            index.add(key, row)
+        self._rows.append(row)
+        self._texts.append(text)
+        self._post(key, trigrams(text))
+
+    def remove(self, row):
+        self.version += 1
+        key = self._keys.pop(id(row), None)
+        if key is None:
+            return
+        for index in self._columns.values():
+            index.remove(key)
+        self._rows[key] = None
+        self._texts[key] = None
+
+    def update(self, row):
+        """Re-index a row whose values changed in place; keeps its position."""
+        key = self._keys.get(id(row))
+        if key is None:
+            self.add(row)
+            return
+        self.version += 1
+        self.columns.update(row)
+        for index in self._columns.values():
+            index.remove(key)
+            index.add(key, row)
+        old_text = self._texts[key]
+        text = self._texts[key] = row_text(row, self.derived)
+        self._post(key, trigrams(text) - trigrams(old_text))
+
+    def _ordered(self, keys):
+        rows = self._rows
+        return [rows[key] for key in sorted(keys)]
+
+    def _substring_keys(self, query):
+        texts = self._texts
+        if len(query) < 3:
+            return [key for key, text in enumerate(texts) if text is not None and query in text]
+        rarest = None
+        for gram in trigrams(query):
+            posting = self._postings.get(gram)
+            if not posting:
+                return []
+            if rarest is None or len(posting) < len(rarest):
+                rarest = posting
+        return [key for key in set(rarest) if query in (texts[key] or "")]
+
+    def search(self, query):
+        """Rows whose text contains query, in the order they were added."""
+        return self._ordered(self._substring_keys(query.lower()))
+
+    def column_index(self, column):
+        index = self._columns.get(column)
+        if index is None:
+            entries = ((k, row) for k, row in enumerate(self._rows) if row is not None)
+            index = ColumnIndex(column, entries, self.derived)
+            self._columns[column] = index
+        return index
+
+    def matches(self, row, query):
+        """Whether an indexed row would be among the results of query."""
+        filters, free = parse_query(query, self.columns)
+        if free and free not in self.text(row):
+            return False
+        for columns, value in filters:
+            if not any(self.column_index(column).accepts(row, value) for column in columns):
+                return False
+        return True
+
+    def query(self, query):
+        """Rows matching every filter in query and containing its free text."""
+        filters, free = parse_query(query, self.columns)
+        if not filters:
+            return self.search(free)
+
+        keys = None
+        for columns, value in filters:
+            matched = set()
+            for column in columns:
+                matched |= self.column_index(column).match(value)
+            keys = matched if keys is None else keys & matched
+            if not keys:
+                return []
+        if free:
+            keys = [key for key in keys if free in self._texts[key]]
+        return self._ordered(keys)
+
+
+class SearchSession:
+    """Remembers recent results so typing stays cheap.
+
+    When a query contains the previous one (the user typed another
+    character) only the previous matches are re-checked. Recent queries are
+    kept in a small LRU so backspacing returns instantly. Everything is
+    dropped as soon as the index changes."""
+
+    def __init__(self, index, cache_size=32):
+        self.index = index
+        self.cache_size = cache_size
+        self._version = index.version
+        self._cache = OrderedDict()
+        self._last_query = None
+        self._last_results = None
+
+    def search(self, query):
+        """Like SearchIndex.query; returns a fresh list the caller may modify."""
+        filters, free = parse_query(query, self.index.columns)
+        # One spelling per query, single-spaced like the free text
+        # parse_query hands to SearchIndex.query
+        query = " ".join(query.lower().split())
+        if self._version != self.index.version:
+            self._cache.clear()
+            self._last_query = None
+            self._version = self.index.version
+
+        is_fielded = bool(filters)
+        results = self._cache.get(query)
+        if results is None:
+            if not is_fielded and self._last_query and self._last_query in free:
+                text = self.index.text
+                results = [row for row in self._last_results if free in text(row)]
+            else:
+                results = self.index.query(query)
+
+        self._cache[query] = results
+        self._cache.move_to_end(query)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        self._last_query = None if is_fielded else query
+        self._last_results = results
+        return list(results)
@@ -0,0 +1,248 @@
+"""Cached sort orders for the table views.
+
+How a column sorts comes from the 'types' entry of database.SCHEMA;
+columns without one sort as text. Each column is reduced once to dense
+integer ranks, so sorting by several columns, in either direction, is a
+single sort over tuples of ints.
+"""
+import locale
+
+import database as db
+
+
+def _text_key(value):
+    # strxfrm follows the LC_COLLATE locale (see main.py); under the
+    # default C locale this is plain case-insensitive ordering.
+    return (0, locale.strxfrm(value.casefold()))
+
+
+def _integer_key(value):
+    try:
+        return (0, int(value), "")
+    except ValueError:
+        return (1, 0, value.casefold())
+
+
+def _student_id_key(value):
+    if db.is_valid_student_id(value):
+        year, seq = value.split("-")
+        return (0, int(year), int(seq), "")
+    return (1, 0, 0, value.casefold())
+
+
+# Type name used in SCHEMA -> function turning a cleaned value into a key.
+# Values that do not fit the type sort after the ones that do.
+SORT_TYPES = {
+    "text": _text_key,
+    "integer": _integer_key,
+    "student_id": _student_id_key,
+}
+
+
+def column_types():
+    """column -> sort type name, merged over every table in SCHEMA."""
+    types = {}
+    for spec in db.SCHEMA.values():
+        types.update(spec.get('types', {}))
+    return types
+
+
+def column_keys(rows, column, type_name="text", func=None):
+    """Sort keys for one column of rows; func computes a derived column.
+    Removed rows (None) get a None key."""
+    key = SORT_TYPES[type_name]
+    keys = []
+    seen = {}   # columns repeat values a lot; convert each distinct one once
+    for row in rows:
+        if row is None:
+            keys.append(None)
+            continue
+        value = func(row) if func else row.get(column, "")
+        converted = seen.get(value)
+        if converted is None:
+            converted = seen[value] = key(str(value).replace("\n", "").strip())
+        keys.append(converted)
+    return keys
+
+
+class SortCache:
+    """Sort ranks and sorted permutations for a list of rows.
+
+    A sort is a sequence of (column, reverse) pairs, most significant
+    first. Ranks are computed once per column and each permutation once per
+    sort, so re-sorting the full table is a list lookup. Ties keep the
+    rows' original order. A filtered subset is put in order by walking the
+    cached permutation with a membership mask instead of sorting it again.
+    derived maps computed column names to functions of a row.
+
+    add, update and remove patch the cached permutations with a binary
+    search instead of sorting again. Each row keeps its position for the
+    life of the cache; removed rows leave a None behind."""
+
+    def __init__(self, rows, types=None, derived=None):
+        self.rows = list(rows)
+        self.types = column_types() if types is None else types
+        self.derived = derived or {}
+        self._live = len(self.rows)
+        self._position = {id(row): i for i, row in enumerate(self.rows)}
+        self._keys = {}
+        self._ranks = {}
+        self._rank_of = {}
+        self._orders = {}
+
+    def __len__(self):
+        return self._live
+
+    def _cell_key(self, column, row):
+        return column_keys([row], column, self.types.get(column, "text"),
+                           self.derived.get(column))[0]
+
+    def keys(self, column):
+        keys = self._keys.get(column)
+        if keys is None:
+            keys = column_keys(self.rows, column, self.types.get(column, "text"),
+                               self.derived.get(column))
+            self._keys[column] = keys
+        return keys
+
+    def _live_positions(self):
+        if self._live == len(self.rows):
+            return range(len(self.rows))
+        return [i for i, row in enumerate(self.rows) if row is not None]
+
+    def ranks(self, column):
+        """Dense rank of every row's value in column (equal values share one)."""
+        ranks = self._ranks.get(column)
+        if ranks is None:
+            keys = self.keys(column)
+            ranks = [0] * len(keys)
+            rank_of = {}
+            for i in sorted(self._live_positions(), key=keys.__getitem__):
+                ranks[i] = rank_of.setdefault(keys[i], len(rank_of))
+            self._ranks[column] = ranks
+            self._rank_of[column] = rank_of
+        return ranks
+
+    def _key(self, spec):
+        """Key function mapping a row position to its composite rank."""
+        if len(spec) == 1:
+            col, reverse = spec[0]
+            ranks = self.ranks(col)
+            return (lambda i: -ranks[i]) if reverse else ranks.__getitem__
+        signed = [(self.ranks(col), -1 if reverse else 1) for col, reverse in spec]
+        return lambda i: tuple(sign * ranks[i] for ranks, sign in signed)
+
+    def order(self, spec):
+        """Row positions sorted by spec."""
+        spec = tuple(spec)
+        order = self._orders.get(spec)
+        if order is None:
+            order = sorted(self._live_positions(), key=self._key(spec))
+            self._orders[spec] = order
+        return order
+
+    def sorted_rows(self, subset, spec):
+        """subset (rows drawn from self.rows) sorted by spec."""
+        rows = self.rows
+        if len(subset) == self._live:
+            return [rows[i] for i in self.order(spec)]
+
+        positions = [self._position[id(row)] for row in subset]
+        if len(subset) * 16 < self._live and tuple(spec) not in self._orders:
+            # Small result and no cached permutation: sorting it beats
+            # building one over the whole table.
+            positions.sort()
+            positions.sort(key=self._key(tuple(spec)))
+            return [rows[i] for i in positions]
+
+        mask = bytearray(len(rows))
+        for i in positions:
+            mask[i] = 1
+        return [rows[i] for i in self.order(spec) if mask[i]]
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+    def _before(self, spec, a, b):
+        """Whether position a sorts before position b under spec."""
+        for column, reverse in spec:
+            keys = self.keys(column)
+            if keys[a] != keys[b]:
+                return (keys[a] < keys[b]) != reverse
+        return a < b
+
+    def _bisect(self, positions, pos, spec):
+        lo, hi = 0, len(positions)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._before(spec, positions[mid], pos):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def locate(self, rows, row, spec):
+        """Index of row in rows, or where it would be inserted, given that
+        rows is ordered by spec (by position when spec is empty)."""
+        position = self._position
+        pos = position[id(row)]
+        lo, hi = 0, len(rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._before(spec, position[id(rows[mid])], pos):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _rekey(self, pos):
+        row = self.rows[pos]
+        for column, keys in self._keys.items():
+            key = self._cell_key(column, row)
+            if pos == len(keys):
+                keys.append(key)
+            else:
+                keys[pos] = key
+            ranks = self._ranks.get(column)
+            if ranks is None:
+                continue
+            rank = self._rank_of[column].get(key)
+            if rank is None:
+                # A value with no rank yet; rank again when next needed
+                del self._ranks[column]
+                del self._rank_of[column]
+            elif pos == len(ranks):
+                ranks.append(rank)
+            else:
+                ranks[pos] = rank
+
+    def _unorder(self, pos):
+        for spec, order in self._orders.items():
+            i = self._bisect(order, pos, spec)
+            if i < len(order) and order[i] == pos:
+                del order[i]
+
+    def _reorder(self, pos):
+        for spec, order in self._orders.items():
+            order.insert(self._bisect(order, pos, spec), pos)
+
+    def add(self, row):
+        pos = len(self.rows)
+        self.rows.append(row)
+        self._position[id(row)] = pos
+        self._live += 1
+        self._rekey(pos)
+        self._reorder(pos)
+
+    def update(self, row):
+        """Re-sort a row whose values were changed in place."""
+        pos = self._position[id(row)]
+        self._unorder(pos)
+        self._rekey(pos)
+        self._reorder(pos)
+
+    def remove(self, row):
+        pos = self._position.pop(id(row))
+        self._unorder(pos)
+        self.rows[pos] = None
+        self._live -= 1
@@ -0,0 +1,411 @@
+"""SQLite implementation of the database.py storage functions.
+
+Enabled with SSIS_BACKEND=sqlite. Each CSV file maps to a table of the
+same name in data/ssis.db with a real primary key and a foreign key to
+its parent (ON UPDATE CASCADE, ON DELETE SET NULL). A NULL foreign key is
+shown as "N/A", which is what the CSV cascades write. On first use the
+database is filled from the existing data/*.csv files.
+"""
+import csv
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+import database as db
+import instrument
+
+DB_FILENAME = 'ssis.db'
+MISSING_PARENT = db.MISSING_PARENT
+
+_conn = None
+_conn_path = None
+_depth = 0
+_writes = 0
+_tables = {}
+
+
+def _table_name(filename):
+    if filename not in db.SCHEMA:
+        raise ValueError(f"Unknown table '{filename}'.")
+    return filename[:-len('.csv')]
+
+
+def _fk_column(filename):
+    parent = db.SCHEMA[filename]['parent']
+    return parent[0] if parent else None
+
+
+def _create_schema(conn):
+    for filename, spec in db.SCHEMA.items():
+        name = _table_name(filename)
+        cols = []
+        for col in spec['columns']:
+            if col == spec['pk']:
+                cols.append(f"{col} TEXT PRIMARY KEY COLLATE NOCASE")
+            else:
+                cols.append(f"{col} TEXT COLLATE NOCASE")
+        if spec['parent']:
+            fk_col, parent_file = spec['parent']
+            parent_pk = db.SCHEMA[parent_file]['pk']
+            cols.append(
+                f"FOREIGN KEY ({fk_col}) REFERENCES {_table_name(parent_file)}({parent_pk}) "
+                f"ON UPDATE CASCADE ON DELETE SET NULL"
+            )
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(cols)})")
+        if spec['parent']:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {name}_{spec['parent'][0]}_idx "
+                f"ON {name}({spec['parent'][0]})"
+            )
+
+
+def connect():
+    """Return the shared connection, creating and seeding the database the
+    first time it is opened."""
+    path = db.get_file_path(DB_FILENAME)
+    if _conn is not None and _conn_path == path:
+        return _conn
+
+    _close()
+    if not os.path.exists(path):
+        _seed(path)
+    _open(path, path)
+    return _conn
+
+
+def _open(path, file_path):
+    """Make a connection to file_path the shared one, standing for path."""
+    global _conn, _conn_path
+    _conn = sqlite3.connect(file_path, isolation_level=None)
+    _conn_path = path
+    _tables.clear()
+    _conn.execute("PRAGMA foreign_keys = ON")
+    _conn.execute("PRAGMA journal_mode = WAL")
+    _conn.execute(f"PRAGMA synchronous = {'FULL' if db.FSYNC_WRITES else 'NORMAL'}")
+    _create_schema(_conn)
+
+
+def _close():
+    global _conn, _conn_path
+    if _conn is not None:
+        _conn.close()
+    _conn = _conn_path = None
+    _tables.clear()
+
+
+def _seed(path):
+    """Create the database at path from the CSV files. It is filled under a
+    temporary name and only renamed into place once the import succeeded,
+    so a failed seed leaves no empty database to be served next time."""
+    tmp_path = path + '.seed'
+    for stale in (tmp_path, tmp_path + '-wal', tmp_path + '-shm'):
+        if os.path.exists(stale):
+            os.remove(stale)
+    _open(path, tmp_path)
+    try:
+        import_from_csv()
+    except BaseException:
+        _close()
+        os.remove(tmp_path)
+        raise
+    _close()    # checkpoints the WAL into tmp_path
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def transaction():
+    """Run the block in one SQLite transaction; nested blocks join the outer one."""
+    global _depth, _writes
+    conn = connect()
+    if _depth == 0:
+        conn.execute("BEGIN IMMEDIATE")
+    _depth += 1
+    try:
+        yield conn
+    except BaseException:
+        _depth -= 1
+        if _depth == 0:
+            conn.execute("ROLLBACK")
+            _tables.clear()
+        raise
+    else:
+        _depth -= 1
+        if _depth == 0:
+            conn.execute("COMMIT")
+    finally:
+        _writes += 1
+
+
+def _to_db(filename, row):
+    fk_col = _fk_column(filename)
+    values = []
+    for col in db.SCHEMA[filename]['columns']:
+        value = str(row.get(col, '')).strip()
+        if col == fk_col and value == MISSING_PARENT:
+            value = None
+        values.append(value)
+    return values
+
+
+def _select_columns(filename):
+    fk_col = _fk_column(filename)
+    return ", ".join(
+        f"COALESCE({col}, '{MISSING_PARENT}') AS {col}" if col == fk_col else col
+        for col in db.SCHEMA[filename]['columns']
+    )
+
+
+def load_table(filename):
+    """Table snapshot for code that wants Table.index(); rebuilt after any
+    write through this connection or another one."""
+    conn = connect()
+    version = (_writes, conn.execute("PRAGMA data_version").fetchone()[0])
+    table = _tables.get(filename)
+    if table is not None and table.signature == version:
+        return table
+    columns = db.SCHEMA[filename]['columns']
+    cursor = conn.execute(
+        f"SELECT {_select_columns(filename)} FROM {_table_name(filename)} ORDER BY rowid"
+    )
+    table = db.Table(list(columns), [dict(zip(columns, r)) for r in cursor], version)
+    instrument.count(rows=len(table.rows))
+    _tables[filename] = table
+    return table
+
+
+def peek_table(filename, count):
+    """(headers, first count rows, total rows), read straight from the
+    database."""
+    conn = connect()
+    columns = db.SCHEMA[filename]['columns']
+    name = _table_name(filename)
+    cursor = conn.execute(
+        f"SELECT {_select_columns(filename)} FROM {name} ORDER BY rowid LIMIT ?", (count,)
+    )
+    rows = [dict(zip(columns, r)) for r in cursor]
+    total = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+    return list(columns), rows, total
+
+
+def save_snapshots():
+    # The database file is already the fast-loading form.
+    pass
+
+
+def invalidate_cache(filename=None):
+    if filename is None:
+        _tables.clear()
+    else:
+        _tables.pop(filename, None)
+
+
+def compact(filename):
+    # SQLite writes in place; there is no journal to fold.
+    pass
+
+
+def read_data(filename):
+    return [dict(row) for row in load_table(filename).rows]
+
+
+def save_data(filename, headers, data):
+    """Make the table hold exactly data. Existing keys are updated in place
+    and missing ones deleted, so the foreign key actions run just as they
+    would for individual edits."""
+    name = _table_name(filename)
+    spec = db.SCHEMA[filename]
+    columns = spec['columns']
+    pk = spec['pk']
+    assignments = ", ".join(f"{col} = excluded.{col}" for col in columns if col != pk)
+    pk_pos = columns.index(pk)
+    with transaction() as conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_keys (k TEXT PRIMARY KEY COLLATE NOCASE)")
+        conn.execute("DELETE FROM keep_keys")
+        # data may be a one-shot iterator (streaming import), so both
+        # statements are fed from a single pass over it.
+        for values in map(lambda row: _to_db(filename, row), data):
+            conn.execute(
+                f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT({pk}) DO UPDATE SET {assignments}",
+                values
+            )
+            conn.execute("INSERT OR IGNORE INTO keep_keys VALUES (?)", (values[pk_pos],))
+            instrument.count(rows=1)
+        conn.execute(f"DELETE FROM {name} WHERE {pk} NOT IN (SELECT k FROM keep_keys)")
+        conn.execute("DELETE FROM keep_keys")
+
+
+def _fetch(conn, filename, column, value):
+    """Rows whose column equals value, as read_data would return them."""
+    columns = db.SCHEMA[filename]['columns']
+    cursor = conn.execute(
+        f"SELECT {_select_columns(filename)} FROM {_table_name(filename)} WHERE {column} = ?",
+        (str(value),)
+    )
+    return [dict(zip(columns, r)) for r in cursor]
+
+
+def append_row(filename, suggested_headers, new_row_dict):
+    columns = db.SCHEMA[filename]['columns']
+    values = _to_db(filename, new_row_dict)
+    with transaction() as conn:
+        conn.execute(
+            f"INSERT INTO {_table_name(filename)} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            values
+        )
+        instrument.count(rows=1)
+        pk = db.SCHEMA[filename]['pk']
+        return _fetch(conn, filename, pk, values[columns.index(pk)])[0]
+
+
+def apply_batch(filename, inserts, updates):
+    columns = db.SCHEMA[filename]['columns']
+    pk = db.SCHEMA[filename]['pk']
+    name = _table_name(filename)
+    with transaction() as conn:
+        inserted = conn.executemany(
+            f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            (_to_db(filename, row) for row in inserts)
+        ).rowcount
+        updated = conn.executemany(
+            f"UPDATE {name} SET {', '.join(f'{c} = ?' for c in columns)} WHERE {pk} = ?",
+            (_to_db(filename, row) + [str(pk_value)] for pk_value, row in updates)
+        ).rowcount
+        instrument.count(rows=inserted + updated)
+
+
+def update_row(filename, pk_value, updated_dict):
+    id_field = list(updated_dict.keys())[0]
+    columns = [col for col in updated_dict if col in db.SCHEMA[filename]['columns']]
+    values = _to_db(filename, updated_dict)
+    by_col = dict(zip(db.SCHEMA[filename]['columns'], values))
+    with transaction() as conn:
+        cursor = conn.execute(
+            f"UPDATE {_table_name(filename)} SET {', '.join(f'{c} = ?' for c in columns)} "
+            f"WHERE {id_field} = ?",
+            [by_col[c] for c in columns] + [str(pk_value)]
+        )
+        if not cursor.rowcount:
+            return None
+        instrument.count(rows=cursor.rowcount)
+        rows = _fetch(conn, filename, id_field, by_col[id_field])
+        return rows[0] if rows else None
+
+
+def delete_record(filename, pk_column, pk_value):
+    with transaction() as conn:
+        removed = _fetch(conn, filename, pk_column, pk_value)
+        conn.execute(
+            f"DELETE FROM {_table_name(filename)} WHERE {pk_column} = ?",
+            (str(pk_value),)
+        )
+        instrument.count(rows=len(removed))
+    return removed
+
+
+def _exists(filename, column, value, exclude=None):
+    sql = f"SELECT 1 FROM {_table_name(filename)} WHERE {column} = ? COLLATE NOCASE"
+    params = [str(value).strip()]
+    if exclude is not None:
+        sql += f" AND {column} <> ? COLLATE NOCASE"
+        params.append(str(exclude).strip())
+    return connect().execute(sql + " LIMIT 1", params).fetchone() is not None
+
+
+def is_unique(filename, column_name, new_value):
+    return not _exists(filename, column_name, new_value)
+
+
+def is_unique_excluding(filename, column, new_value, exclude_value):
+    return not _exists(filename, column, new_value, exclude=exclude_value)
+
+
+def parent_exists(parent_filename, parent_column, value):
+    return _exists(parent_filename, parent_column, value)
+
+
+# The foreign keys carry the cascades; the counts are taken beforehand
+# because SQLite does not report rows changed by foreign key actions. The
+# update_college_cascade style wrappers in database.py route here.
+def _count_children(conn, filename, value):
+    counts = {}
+    for child, fk_col in db.child_tables(filename):
+        counts[child] = conn.execute(
+            f"SELECT COUNT(*) FROM {_table_name(child)} WHERE {fk_col} = ?",
+            (str(value),)
+        ).fetchone()[0]
+    return counts
+
+
+def update_cascade(filename, old_pk, updated_dict):
+    pk = db.SCHEMA[filename]['pk']
+    with transaction() as conn:
+        changes = {filename: conn.execute(
+            f"SELECT COUNT(*) FROM {_table_name(filename)} WHERE {pk} = ?", (str(old_pk),)
+        ).fetchone()[0]}
+        if updated_dict[pk] != old_pk:
+            changes.update(_count_children(conn, filename, old_pk))
+        update_row(filename, old_pk, {pk: updated_dict[pk], **updated_dict})
+    return changes
+
+
+def delete_cascade(filename, pk_value):
+    pk = db.SCHEMA[filename]['pk']
+    with transaction() as conn:
+        changes = {filename: conn.execute(
+            f"SELECT COUNT(*) FROM {_table_name(filename)} WHERE {pk} = ?", (str(pk_value),)
+        ).fetchone()[0]}
+        changes.update(_count_children(conn, filename, pk_value))
+        delete_record(filename, pk, pk_value)
+    return changes
+
+
+# ----------------------------------------------------------------------
+# CSV import / export
+# ----------------------------------------------------------------------
+def import_from_csv(data_dir=None):
+    """Replace the database contents with the CSV files in data_dir.
+
+    Foreign keys naming a parent that is not in the data (which the CSV
+    files allow) are stored as NULL, i.e. "N/A", instead of failing the
+    whole import. Returns filename -> number of rows detached that way."""
+    data_dir = data_dir or db.DATA_DIR
+    keys = {}
+    detached = {}
+    with transaction():
+        # SCHEMA lists parents before their children
+        for filename, spec in db.SCHEMA.items():
+            path = os.path.join(data_dir, filename)
+            rows = []
+            if os.path.exists(path):
+                with open(path, mode='r', encoding='utf-8', newline='') as f:
+                    rows = list(csv.DictReader(f, skipinitialspace=True))
+            if spec['parent']:
+                fk_col, parent_file = spec['parent']
+                parent_keys = keys[parent_file]
+                detached[filename] = 0
+                for row in rows:
+                    value = (row.get(fk_col) or '').strip()
+                    if value != MISSING_PARENT and db.normalize_key(value) not in parent_keys:
+                        row[fk_col] = MISSING_PARENT
+                        detached[filename] += 1
+            keys[filename] = {db.normalize_key(row.get(spec['pk']) or '') for row in rows}
+            if os.path.exists(path):
+                save_data(filename, spec['columns'], rows)
+    return detached
+
+
+def export_to_csv(data_dir=None):
+    """Write every table out in the data/*.csv layout."""
+    data_dir = data_dir or db.DATA_DIR
+    os.makedirs(data_dir, exist_ok=True)
+    for filename, spec in db.SCHEMA.items():
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{filename}.', suffix='.tmp', dir=data_dir)
+        with open(fd, mode='w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=spec['columns'])
+            writer.writeheader()
+            writer.writerows(load_table(filename).rows)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, os.path.join(data_dir, filename))